@@ -8,5 +8,7 @@ from .cardinality import (AttemptedCardinalityViolation,
 from .properties import (StringProperty, IntegerProperty, AliasProperty,
         FloatProperty, BooleanProperty, DateTimeProperty, DateProperty,
         JSONProperty)
-from .exception import InflateError, DeflateError, UniqueProperty
+from .exception import InflateError, DeflateError, UniqueProperty, SessionFlushError
 from .signals import SIGNAL_SUPPORT
+from .concurrency import gather
+from .profiling import count_queries, assert_max_queries, detect_n_plus_one, NPlusOneWarning
@@ -0,0 +1,75 @@
+"""
+asyncio bridge, python 3.4 and later.
+
+This is not an asynchronous client. neomodel talks to the server through
+py2neo's blocking REST client, so each call runs on a worker thread of the
+executor shared with neomodel.gather, and the returned future can be
+awaited from a coroutine::
+
+    from neomodel import aio
+
+    results, columns = await aio.cypher_query(query, params)
+    people = await aio.defer(Person.index).search(age=3)
+    friends = await aio.defer(jim).friends.all()
+    bob = await aio.defer(Person).create({'name': 'Bob'})
+
+Every call in progress occupies a worker, at most max_workers run at once
+and the rest wait for a free one, see configure(). The event loop itself is
+never blocked. A worker checks out a connection for the duration of a call
+and hands it back to the pool afterwards, so idle workers don't hold
+connections other threads are waiting for.
+
+Calls must be made while the event loop is running, typically from a
+coroutine. Sessions and identity maps belong to the calling thread, they
+don't apply to deferred calls.
+"""
+import functools
+from . import core
+from .concurrency import configure, get_executor  # noqa
+try:
+    import asyncio
+    AIO_SUPPORT = True
+except ImportError:
+    AIO_SUPPORT = False
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except AttributeError:  # python < 3.7
+        return asyncio.get_event_loop()
+
+
+def _released(fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        # workers outlive calls, don't keep a connection from the pool between them
+        core.get_pool().release()
+
+
+def run(fn, *args, **kwargs):
+    """ Run the blocking call fn(*args, **kwargs) on the executor, returns an awaitable future """
+    if not AIO_SUPPORT:
+        raise Exception("neomodel.aio requires asyncio, python 3.4 or later")
+    return _running_loop().run_in_executor(get_executor(), functools.partial(_released, fn, *args, **kwargs))
+
+
+def cypher_query(query, params=None):
+    return run(core.cypher_query, query, params)
+
+
+class defer(object):
+    """
+    Proxy making method calls on obj, or on its attributes, return futures
+    rather than blocking. Attributes that aren't callable are proxied too
+    so relationship managers may be reached through their node.
+    """
+    def __init__(self, obj):
+        self._obj = obj
+
+    def __getattr__(self, name):
+        attr = getattr(self._obj, name)
+        if callable(attr):
+            return functools.partial(run, attr)
+        return defer(attr)
@@ -1,4 +1,43 @@
 from .relationship_manager import RelationshipManager, ZeroOrMore # noqa
+from .unitofwork import current_session
+
+
+def _has_relationship(manager):
+    """ existing relationships or connections pending in the current session """
+    # nodes awaiting creation in a session have no relationships yet
+    saved = manager.origin.__node__ is not None
+    session = current_session()
+    if session is not None:
+        connected, disconnected = session.pending_changes(manager)
+        if connected:
+            return True
+        if disconnected:
+            if not saved:
+                return False
+            gone = set(obj.__node__._id for obj in disconnected if obj.__node__ is not None)
+            return any(node.__node__._id not in gone
+                       for node in manager.origin.traverse(manager.name).run())
+    return saved and manager.exists()
+
+
+def _connect_exclusive(manager, nodes, properties):
+    """ connect_many for single relationships, checked by the server in the same request """
+    nodes = list(nodes)
+    if len(nodes) > 1:
+        raise AttemptedCardinalityViolation(
+                "Can't connect {0} nodes to {1}".format(len(nodes), manager))
+    if not nodes:
+        return []
+    # validates properties against nodes, one dict for the single node
+    nodes, properties = manager._many_args(nodes, properties)
+    if current_session() is not None:
+        return [manager.connect(nodes[0], properties[0])]
+    manager.origin._pre_action_check(manager.name + '.connect_many')
+    rels = manager._connect_many(nodes, properties, exclusive=True)
+    if rels[0] is None:
+        raise AttemptedCardinalityViolation(
+                "Node already has {0} can't connect more".format(manager))
+    return rels
 
 
 class ZeroOrOne(RelationshipManager):
@@ -16,12 +55,15 @@ class ZeroOrOne(RelationshipManager):
         return [node] if node else []
 
     def connect(self, obj, properties=None):
-        if len(self):
+        if _has_relationship(self):
             raise AttemptedCardinalityViolation(
                     "Node already has {0} can't connect more".format(self))
         else:
             return super(ZeroOrOne, self).connect(obj, properties)
 
+    def connect_many(self, nodes, properties=None):
+        return _connect_exclusive(self, nodes, properties)
+
 
 class OneOrMore(RelationshipManager):
     description = "one or more relationships"
@@ -64,13 +106,17 @@ class One(RelationshipManager):
         raise AttemptedCardinalityViolation("Cardinality one, cannot disconnect use reconnect")
 
     def connect(self, obj, properties=None):
-        if self.origin.__node__ is None:
+        session = current_session()
+        if self.origin.__node__ is None and not (session and session.is_pending(self.origin)):
             raise Exception("Node has not been saved cannot connect!")
-        if len(self):
+        if _has_relationship(self):
             raise AttemptedCardinalityViolation("Node already has one relationship")
         else:
             return super(One, self).connect(obj, properties)
 
+    def connect_many(self, nodes, properties=None):
+        return _connect_exclusive(self, nodes, properties)
+
 
 class AttemptedCardinalityViolation(Exception):
     pass
@@ -0,0 +1,122 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from . import core
+from .core import cypher_query, get_pool
+from .traversal import TraversalSet
+
+if sys.version_info >= (3, 0):
+    from queue import Queue, Empty
+else:
+    from Queue import Queue, Empty  # noqa
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+# worker threads, defaults to the connection pool size when it is bounded
+MAX_WORKERS = None
+DEFAULT_MAX_WORKERS = 10
+
+
+def configure(max_workers=None):
+    """ Replace the executor with one running at most max_workers calls at once """
+    global _executor, MAX_WORKERS
+    with _executor_lock:
+        MAX_WORKERS = max_workers
+        old, _executor = _executor, None
+    if old is not None:
+        old.shutdown(wait=False)
+
+
+def get_executor():
+    """
+    Executor shared by gather and neomodel.aio, created on first use and
+    again in forked children
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=executor_size())
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def executor_size():
+    return MAX_WORKERS or core.POOL_SIZE or DEFAULT_MAX_WORKERS
+
+
+def _as_callable(call):
+    if isinstance(call, TraversalSet):
+        return call.run
+    if isinstance(call, (str, type(u''))):
+        return lambda: cypher_query(call)
+    if isinstance(call, tuple):
+        return lambda: cypher_query(*call)
+    if callable(call):
+        return call
+    raise TypeError("Can't gather {0!r}, expected a TraversalSet, cypher query or callable".format(call))
+
+
+def gather(*calls, **kwargs):
+    """
+    Run independent reads concurrently and return their results in order::
+
+        friends, people, (rows, columns) = gather(
+            jim.traverse('friends'),
+            functools.partial(Person.index.search, age=3),
+            ("START a=node({id}) RETURN a.name", {'id': 1}))
+
+    A call may be a TraversalSet, evaluated with run(), a cypher query string
+    or (query, params) tuple, or any callable taking no arguments.
+
+    Calls run on the executor shared with neomodel.aio and on the calling
+    thread. At most max_workers calls run at once, defaulting to the size of
+    the executor, see configure(). With return_exceptions=True failed calls give their exception in
+    place of a result, otherwise the first failure in call order is raised
+    once every call has finished.
+    """
+    max_workers = kwargs.pop('max_workers', None)
+    return_exceptions = kwargs.pop('return_exceptions', False)
+    if kwargs:
+        raise TypeError("Unexpected arguments: " + ', '.join(kwargs))
+
+    calls = [_as_callable(call) for call in calls]
+    results = [None] * len(calls)
+    failed = [False] * len(calls)
+    queue = Queue()
+    for i in range(len(calls)):
+        queue.put(i)
+
+    def drain():
+        while True:
+            try:
+                i = queue.get_nowait()
+            except Empty:
+                return
+            try:
+                results[i] = calls[i]()
+            except Exception as e:
+                results[i], failed[i] = e, True
+
+    def worker():
+        try:
+            drain()
+        finally:
+            get_pool().release()
+
+    # the calling thread drains the queue too, so calls complete even when
+    # every executor thread is busy, e.g. gather called from a worker
+    workers = min(max_workers or executor_size(), len(calls))
+    executor = get_executor()
+    futures = [executor.submit(worker) for _ in range(workers - 1)]
+    drain()
+    for future in futures:
+        future.result()
+
+    if not return_exceptions:
+        for result, fail in zip(results, failed):
+            if fail:
+                raise result
+    return results
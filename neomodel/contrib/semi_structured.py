@@ -1,5 +1,4 @@
 from ..core import StructuredNode
-from ..properties import Property, AliasProperty
 
 
 class InflateConflict(Exception):
@@ -50,26 +49,22 @@ class SemiStructuredNode(StructuredNode):
         super(SemiStructuredNode, self).__init__(*args, **kwargs)
 
     @classmethod
-    def inflate(cls, node):
+    def _inflate_instance(cls, data, node):
         props = {}
-        for key, prop in cls._class_properties().items():
-            if (issubclass(prop.__class__, Property)
-                    and not isinstance(prop, AliasProperty)):
-                if key in node.__metadata__['data']:
-                    props[key] = prop.inflate(node.__metadata__['data'][key], node)
-                elif prop.has_default:
-                    props[key] = prop.default_value()
-                else:
-                    props[key] = None
+        for key, prop in cls.__schema__.properties:
+            if key in data:
+                props[key] = prop.inflate(data[key], node)
+            elif prop.has_default:
+                props[key] = prop.default_value()
+            else:
+                props[key] = None
         # handle properties not defined on the class
-        for free_key in [key for key in node.__metadata__['data'] if key not in props]:
+        for free_key in [key for key in data if key not in props]:
             if hasattr(cls, free_key):
-                raise InflateConflict(cls, free_key, node.__metadata__['data'][free_key], node._id)
-            props[free_key] = node.__metadata__['data'][free_key]
+                raise InflateConflict(cls, free_key, data[free_key], node._id)
+            props[free_key] = data[free_key]
 
-        snode = cls(**props)
-        snode.__node__ = node
-        return snode
+        return cls(**props)
 
     @classmethod
     def deflate(cls, node_props, obj=None):
@@ -3,16 +3,22 @@ from py2neo.packages.httpstream import SocketError
 from py2neo.exceptions import ClientError
 from .exception import DoesNotExist, CypherException
 from .util import camel_to_upper, CustomBatch, _legacy_conflict_check
-from .properties import Property, PropertyManager, AliasProperty
+from .properties import Property, PropertyManager, ClassSchema
 from .relationship_manager import RelationshipManager, OUTGOING
 from .traversal import TraversalSet, Query
-from .signals import hooks
-from .index import NodeIndexManager
+from .signals import exec_hook
+from . import metrics, slowlog, querystats
+from .unitofwork import session, current_session
+from .identitymap import identity_map, current_identity_map
+from .pool import ConnectionPool, PoolTimeout, reset_http_connections
+from .index import NodeIndexManager, register_index, warm_indexes, invalidate_indexes
 import os
-import time
 import sys
+import threading
+import functools
 import logging
 import json
+from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
@@ -23,11 +29,37 @@ else:
 
 DATABASE_URL = os.environ.get('NEO4J_REST_URL', 'http://localhost:7474/db/data/')
 
+# log each cypher query at debug level
+CYPHER_DEBUG = bool(os.environ.get('NEOMODEL_CYPHER_DEBUG', False))
+
+
+def _env_number(name, cast):
+    value = os.environ.get(name)
+    return cast(value) if value else None
+
+# connection pool settings, see configure_pool
+POOL_SIZE = _env_number('NEOMODEL_POOL_SIZE', int)
+POOL_MAX_IN_FLIGHT = _env_number('NEOMODEL_POOL_MAX_IN_FLIGHT', int)
+POOL_TIMEOUT = _env_number('NEOMODEL_POOL_TIMEOUT', float)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _connect(url):
+    try:
+        db = neo4j.GraphDatabaseService(url)
+    except SocketError as e:
+        raise SocketError("Error connecting to {0} - {1}".format(url, e))
+
+    if db.neo4j_version >= (2, 0):
+        raise Exception("Support for neo4j 2.0 is in progress but not supported by this release.")
+    if db.neo4j_version < (1, 8):
+        raise Exception("Versions of neo4j prior to 1.8 are unsupported.")
+    return db
 
-def connection():
-    if hasattr(connection, 'db'):
-        return connection.db
 
+def _create_pool():
     url = DATABASE_URL
     u = urlparse(url)
     if u.netloc.find('@') > -1:
@@ -35,39 +67,137 @@ def connection():
         user, password, = credentials.split(':')
         neo4j.authenticate(host, user, password)
         url = ''.join([u.scheme, '://', host, u.path, u.query])
+    return ConnectionPool(url, POOL_SIZE, POOL_MAX_IN_FLIGHT, POOL_TIMEOUT, factory=_connect)
 
-    try:
-        connection.db = neo4j.GraphDatabaseService(url)
-    except SocketError as e:
-        raise SocketError("Error connecting to {0} - {1}".format(url, e))
 
-    if connection.db.neo4j_version >= (2, 0):
-        raise Exception("Support for neo4j 2.0 is in progress but not supported by this release.")
-    if connection.db.neo4j_version < (1, 8):
-        raise Exception("Versions of neo4j prior to 1.8 are unsupported.")
+def get_pool():
+    """ Connection pool of the current process, created again in forked children """
+    global _pool
+    pool = _pool
+    if pool is None or pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                if _pool is not None:
+                    # forked, the inherited sockets belong to the parent
+                    reset_http_connections()
+                _pool = _create_pool()
+            pool = _pool
+    return pool
+
+
+def configure_pool(size=None, max_in_flight=None, timeout=None):
+    """ Replace the connection pool with one using the given limits """
+    global _pool, POOL_SIZE, POOL_MAX_IN_FLIGHT, POOL_TIMEOUT
+    with _pool_lock:
+        POOL_SIZE, POOL_MAX_IN_FLIGHT, POOL_TIMEOUT = size, max_in_flight, timeout
+        _pool = None
 
-    return connection.db
+
+def pool_stats():
+    return get_pool().stats()
+
+
+def connection():
+    """ Connection for the current thread, checked out from the pool """
+    return get_pool().checkout()
+
+
+def release_connection():
+    """ Return the current thread's connection to the pool, e.g at the end of a request """
+    get_pool().release()
+
+
+@contextmanager
+def _request(kind, model=None, query=None, params=None):
+    """ Time a request made directly through py2neo, holding an in flight slot.
+        The clock starts once the connection and the slot are held, the time
+        spent getting them is the event's wait """
+    start = metrics.clock()
+    pool = get_pool()
+    pool.checkout()
+    with pool.request():
+        wait = metrics.clock() - start
+        with metrics.measure(kind, model, query, params) as event:
+            event['wait'] = wait
+            yield event
 
 
 def cypher_query(query, params=None):
+    return _cypher_query(query, params)
+
+
+def _cypher_query(query, params, model=None):
     if isinstance(query, Query):
         query = query.__str__()
 
-    try:
-        cq = neo4j.CypherQuery(connection(), '')
-        start = time.clock()
-        r = neo4j.CypherResults(cq._cypher._post({'query': query, 'params': params or {}}))
-        end = time.clock()
-        results = [list(rr.values) for rr in r.data], list(r.columns)
-    except ClientError as e:
-        raise CypherException(query, params, e.args[0], e.exception, e.stack_trace)
-
-    if os.environ.get('NEOMODEL_CYPHER_DEBUG', False):
-        logger.debug("query: " + query + "\nparams: " + repr(params) + "\ntook: %.2gs\n" % (end - start))
+    body = {'query': query, 'params': params or {}}
+    with _request('cypher', model, query, params) as event:
+        try:
+            cq = neo4j.CypherQuery(connection(), '')
+            r = neo4j.CypherResults(cq._cypher._post(body))
+            results = [list(rr.values) for rr in r.data], list(r.columns)
+        except ClientError as e:
+            raise CypherException(query, params, e.args[0], e.exception, e.stack_trace)
+        event['rows'] = len(results[0])
+        if metrics.active():
+            event['request_bytes'] = metrics.payload_size(body)
+            event['response_bytes'] = metrics.payload_size({'columns': results[1], 'data': results[0]})
+
+    if CYPHER_DEBUG:
+        logger.debug("query: " + query + "\nparams: " + repr(params) + "\ntook: %.2gs\n" % event['duration'])
 
     return results
 
 
+def cypher_stream(query, params=None):
+    """ Run query, yielding each row as it is parsed from the streamed response.
+        The response stays open, holding its pool slot, until the generator
+        is exhausted or closed. Its duration in metrics excludes the time the
+        caller spends between rows, reported as idle """
+    return _cypher_stream(query, params)
+
+
+def _cypher_stream(query, params, model=None):
+    if isinstance(query, Query):
+        query = query.__str__()
+
+    if CYPHER_DEBUG:
+        logger.debug("query: " + query + "\nparams: " + repr(params) + "\nstreamed\n")
+
+    body = {'query': query, 'params': params or {}}
+    with _request('cypher', model, query, params) as event:
+        active = metrics.active()
+        if active:
+            event['request_bytes'] = metrics.payload_size(body)
+            event['response_bytes'] = 0
+        event['rows'] = 0
+        # time spent by the caller between rows isn't the server's
+        event['idle'] = 0.0
+        cq = neo4j.CypherQuery(connection(), '')
+        try:
+            r = neo4j.IterableCypherResults(cq._cypher._post(body))
+        except ClientError as e:
+            raise CypherException(query, params, e.args[0], e.exception, e.stack_trace)
+        try:
+            for rr in r:
+                row = list(rr.values)
+                event['rows'] += 1
+                if active:
+                    event['response_bytes'] += metrics.payload_size(row) or 0
+                paused = metrics.clock()
+                try:
+                    yield row
+                finally:
+                    event['idle'] += metrics.clock() - paused
+        finally:
+            r.close()
+
+
+DELETE_QUERY = "START self=node({self}) MATCH (self)-[r]-() DELETE r, self"
+DELETE_BATCH_SIZE = 500
+SAVE_BATCH_SIZE = 500
+
+
 class CypherMixin(object):
     @property
     def client(self):
@@ -78,7 +208,14 @@ class CypherMixin(object):
         assert self.__node__ is not None
         params = params or {}
         params.update({'self': self.__node__._id})  # TODO: this will break stuff!
-        return cypher_query(query, params)
+        return _cypher_query(query, params, self.__class__.__name__)
+
+    def cypher_stream(self, query, params=None):
+        self._pre_action_check('cypher_stream')
+        assert self.__node__ is not None
+        params = params or {}
+        params.update({'self': self.__node__._id})
+        return _cypher_stream(query, params, self.__class__.__name__)
 
 
 class StructuredNodeMeta(type):
@@ -99,10 +236,14 @@ class StructuredNodeMeta(type):
             if '__index__' in dct or hasattr(inst, '__index__'):
                 name = dct['__index__'] if '__index__' in dct else getattr(inst, '__index__')
             inst.index = NodeIndexManager(inst, name)
+            register_index(inst.index)
+        inst.__schema__ = ClassSchema(inst)
+        for key, rel in inst.__schema__.relationships:
+            rel.name = key
         return inst
 
 
-StructuredNodeBase = StructuredNodeMeta('StructuredNodeBase', (PropertyManager,), {})
+StructuredNodeBase = StructuredNodeMeta('StructuredNodeBase', (PropertyManager,), {'__abstract_node__': True})
 
 
 class StructuredNode(StructuredNodeBase, CypherMixin):
@@ -112,10 +253,7 @@ class StructuredNode(StructuredNodeBase, CypherMixin):
     """
 
     __abstract_node__ = True
-
-    def __init__(self, *args, **kwargs):
-        self.__node__ = None
-        super(StructuredNode, self).__init__(*args, **kwargs)
+    __node__ = None
 
     @classmethod
     def category(cls):
@@ -124,48 +262,176 @@ class StructuredNode(StructuredNodeBase, CypherMixin):
     def __eq__(self, other):
         if not isinstance(other, (StructuredNode,)):
             raise TypeError("Cannot compare neomodel node with a " + other.__class__.__name__)
+        if self.__node__ is None or other.__node__ is None:
+            # unsaved nodes are only equal to themselves
+            return self is other
         return self.__node__ == other.__node__
 
     def __ne__(self, other):
-        if not isinstance(other, (StructuredNode,)):
-            raise TypeError("Cannot compare neomodel node with a " + other.__class__.__name__)
-        return self.__node__ != other.__node__
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        # the hash must not change on save, so unsaved nodes have none
+        if self.__node__ is None:
+            raise TypeError("Unsaved {0} instances are unhashable".format(self.__class__.__name__))
+        return hash(self.__node__._id)
 
     def __json__(self):
         return self.__properties__
 
-    @hooks
     def save(self):
+        exec_hook('pre_save', self)
+        session = current_session()
         # create or update instance node
-        if self.__node__ is not None:
-            batch = CustomBatch(connection(), self.index.name, self.__node__._id)
-            batch.remove_from_index(neo4j.Node, index=self.index.__index__, entity=self.__node__)
-            props = self.deflate(self.__properties__, self.__node__._id)
-            batch.set_properties(self.__node__, props)
-            self._update_indexes(self.__node__, props, batch)
-            batch.submit()
-        elif hasattr(self, '_is_deleted') and self._is_deleted:
+        if self._deleted_in(session):
             raise ValueError("{}.save() attempted on deleted node".format(self.__class__.__name__))
+        elif session is not None:
+            # hooks run once the session has sent the save
+            session.save(self, after=functools.partial(exec_hook, 'post_save', self))
+            return self
+        elif self.__node__ is not None:
+            batch = CustomBatch(connection(), self.index.name, self.__node__._id, self.__class__.__name__)
+            self._batch_update(batch)
+            batch.submit()
         else:
             self.__node__ = self.create(self.__properties__)[0].__node__
+            imap = current_identity_map()
+            if imap is not None:
+                imap.add(self)
             if hasattr(self, 'post_create'):
                 self.post_create()
+        exec_hook('post_save', self)
         return self
 
-    def _pre_action_check(self, action):
+    @classmethod
+    def save_many(cls, nodes, batch_size=SAVE_BATCH_SIZE):
+        """ Update already saved nodes, batch_size nodes per request. A unique index
+            conflict raises UniqueProperty for the conflicting node, chunks sent
+            before it are kept """
+        nodes = list(nodes)
+        for node in nodes:
+            node._pre_action_check('save_many')
+            exec_hook('pre_save', node)
+
+        session = current_session()
+        if session is not None:
+            for node in nodes:
+                session.save(node, after=functools.partial(exec_hook, 'post_save', node))
+            return nodes
+
+        for start in range(0, len(nodes), batch_size):
+            batch = CustomBatch(connection(), cls.index.name, model=cls.__name__)
+            for node in nodes[start:start + batch_size]:
+                batch.mark(node.index.name, node.__node__._id)
+                node._batch_update(batch)
+            batch.submit()
+
+        for node in nodes:
+            exec_hook('post_save', node)
+        return nodes
+
+    def _batch_update(self, batch, db_node=None, props=None):
+        """ add requests updating the properties and index entries of this node,
+            db_node and props default to the current ones """
+        if db_node is None:
+            db_node = self.__node__
+        if props is None:
+            props = self.deflate(self.__properties__, db_node._id)
+        batch.remove_from_index(neo4j.Node, index=self.index.__index__, entity=db_node)
+        batch.set_properties(db_node, props)
+        self._update_indexes(db_node, props, batch)
+
+    def _deleted_in(self, session):
+        """ true if deleted, or to be deleted when session is sent """
         if hasattr(self, '_is_deleted') and self._is_deleted:
+            return True
+        return session is not None and session.is_deleted(self)
+
+    def _pre_action_check(self, action):
+        if self._deleted_in(current_session()):
             raise ValueError("{}.{}() attempted on deleted node".format(self.__class__.__name__, action))
         if self.__node__ is None:
+            # nodes awaiting creation in a session may already be connected
+            session = current_session()
+            if action.endswith('.connect') and session and session.is_pending(self):
+                return
             raise ValueError("{}.{}() attempted on unsaved node".format(self.__class__.__name__, action))
 
-    @hooks
     def delete(self):
+        exec_hook('pre_delete', self)
         self._pre_action_check('delete')
-        self.index.__index__.remove(entity=self.__node__)  # not sure if this is necessary
-        self.cypher("START self=node({self}) MATCH (self)-[r]-() DELETE r, self")
+        session = current_session()
+        imap = current_identity_map()
+        if session is not None:
+            # forget the node once the session has sent the delete
+            session.delete(self, after=functools.partial(self._forget_node, imap))
+        else:
+            index = self.index.__index__
+            with _request('index', self.__class__.__name__):
+                index.remove(entity=self.__node__)  # not sure if this is necessary
+            self.cypher(DELETE_QUERY)
+            self._forget_node(imap)
+        return True
+
+    def _forget_node(self, imap):
+        """ mark as deleted and run the post_delete hook """
+        if imap is not None:
+            imap.discard(self.__node__._id)
         self.__node__ = None
         self._is_deleted = True
-        return True
+        exec_hook('post_delete', self)
+
+    @classmethod
+    def delete_many(cls, nodes, batch_size=DELETE_BATCH_SIZE):
+        """ Delete instances of this class or node ids with their relationships
+            and index entries, batch_size nodes per request """
+        instances, ids, owners = [], [], []
+        for node in nodes:
+            if isinstance(node, StructuredNode):
+                node._pre_action_check('delete')
+                instances.append(node)
+                ids.append(node.__node__._id)
+                owners.append(node)
+            else:
+                ids.append(int(node))
+                owners.append(None)
+
+        for node in instances:
+            exec_hook('pre_delete', node)
+
+        session = current_session()
+        imap = current_identity_map()
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            chunk_instances = [node for node in owners[start:start + batch_size] if node is not None]
+            forget = functools.partial(cls._forget_many, chunk, chunk_instances, imap)
+            if session is not None:
+                for node in chunk_instances:
+                    session.mark_deleted(node)
+                op = session._record(('delete_many', cls, chunk), functools.partial(cls._batch_delete, chunk),
+                                     index_name=cls.index.name, model=cls.__name__)
+                op.after.append(forget)
+            else:
+                batch = CustomBatch(connection(), cls.index.name, model=cls.__name__)
+                cls._batch_delete(chunk, batch)
+                batch.submit()
+                forget()
+        return len(ids)
+
+    @classmethod
+    def _forget_many(cls, ids, instances, imap):
+        if imap is not None:
+            for nid in ids:
+                imap.discard(nid)
+        for node in instances:
+            node._forget_node(None)
+
+    @classmethod
+    def _batch_delete(cls, ids, batch):
+        db = batch._graph_db
+        for nid in ids:
+            batch.remove_from_index(neo4j.Node, index=cls.index.__index__, entity=db.node(nid))
+        batch.append_cypher(DELETE_QUERY, {'self': ids})
 
     def traverse(self, rel_manager, *args):
         self._pre_action_check('traverse')
@@ -175,9 +441,14 @@ class StructuredNode(StructuredNodeBase, CypherMixin):
         self._pre_action_check('refresh')
         """Reload this object from its node in the database"""
         if self.__node__ is not None:
-            if self.__node__.exists:
-                props = self.inflate(
-                    self.client.node(self.__node__._id)).__properties__
+            with _request('node', self.__class__.__name__):
+                exists = self.__node__.exists
+            if exists:
+                node = self.client.node(self.__node__._id)
+                with _request('node', self.__class__.__name__):
+                    data = node.__metadata__['data']
+                # bypass the identity map, it would hand back this instance
+                props = self._inflate_instance(data, node).__properties__
                 for key, val in props.items():
                     setattr(self, key, val)
             else:
@@ -187,7 +458,7 @@ class StructuredNode(StructuredNodeBase, CypherMixin):
     @classmethod
     def create(cls, *props):
         category = cls.category()
-        batch = CustomBatch(connection(), cls.index.name)
+        batch = CustomBatch(connection(), cls.index.name, model=cls.__name__)
         deflated = [cls.deflate(p) for p in list(props)]
         # build batch
         for p in deflated:
@@ -202,19 +473,15 @@ class StructuredNode(StructuredNodeBase, CypherMixin):
 
     @classmethod
     def inflate(cls, node):
-        props = {}
-        for key, prop in cls._class_properties().items():
-            if (issubclass(prop.__class__, Property)
-                and not isinstance(prop, AliasProperty)):
-                if key in node.__metadata__['data']:
-                    props[key] = prop.inflate(node.__metadata__['data'][key], node)
-                elif prop.has_default:
-                    props[key] = prop.default_value()
-                else:
-                    props[key] = None
-
-        snode = cls(**props)
+        imap = current_identity_map()
+        if imap is not None:
+            snode = imap.get(node._id)
+            if isinstance(snode, cls):
+                return snode
+        snode = cls._inflate_instance(node.__metadata__['data'], node)
         snode.__node__ = node
+        if imap is not None:
+            imap.add(snode)
         return snode
 
     @classmethod
@@ -227,16 +494,15 @@ class StructuredNode(StructuredNodeBase, CypherMixin):
         if batch._graph_db.neo4j_version < (1, 9):
             _legacy_conflict_check(cls, node, props)
 
+        schema = cls.__schema__
         for key, value in props.items():
-            if key in cls._class_properties():
-                node_property = cls.get_property(key)
-                if node_property.unique_index:
-                    try:
-                        batch.add_to_index_or_fail(neo4j.Node, cls.index.__index__, key, value, node)
-                    except NotImplementedError:
-                        batch.get_or_add_to_index(neo4j.Node, cls.index.__index__, key, value, node)
-                elif node_property.index:
-                    batch.add_to_index(neo4j.Node, cls.index.__index__, key, value, node)
+            if key in schema.unique_indexed:
+                try:
+                    batch.add_to_index_or_fail(neo4j.Node, cls.index.__index__, key, value, node)
+                except NotImplementedError:
+                    batch.get_or_add_to_index(neo4j.Node, cls.index.__index__, key, value, node)
+            elif key in schema.indexed:
+                batch.add_to_index(neo4j.Node, cls.index.__index__, key, value, node)
         return batch
 
 
@@ -261,12 +527,40 @@ class InstanceManager(RelationshipManager):
         raise Exception("disconnect not available from category node")
 
 
+# category nodes by class, along with the connection pool they were resolved on
+_category_cache = {}
+_category_lock = threading.Lock()
+
+
 def category_factory(instance_cls):
-    """ Retrieve category node by name """
+    """ Retrieve category node by name, cached per class and connection pool """
+    pool = get_pool()
+    cached = _category_cache.get(instance_cls)
+    if cached is not None and cached[0] is pool:
+        return cached[1]
+
+    with _category_lock:
+        cached = _category_cache.get(instance_cls)
+        if cached is None or cached[0] is not pool:
+            cached = (pool, _build_category(instance_cls))
+            _category_cache[instance_cls] = cached
+    return cached[1]
+
+
+def clear_category_cache():
+    """ Forget all cached category nodes """
+    with _category_lock:
+        _category_cache.clear()
+
+
+def _build_category(instance_cls):
     name = instance_cls.__name__
-    category_index = connection().get_or_create_index(neo4j.Node, 'Category')
+    db = connection()
+    with _request('index', name):
+        category_index = db.get_or_create_index(neo4j.Node, 'Category')
     category = CategoryNode(name)
-    category.__node__ = category_index.get_or_create('category', name, {'category': name})
+    with _request('category', name):
+        category.__node__ = category_index.get_or_create('category', name, {'category': name})
     rel_type = camel_to_upper(instance_cls.__name__)
     category.instance = InstanceManager({
                                             'direction': OUTGOING,
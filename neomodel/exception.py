@@ -10,6 +10,17 @@ class UniqueProperty(ValueError):
         return msg.format(self.value, self.property_name, self.node, self.index_name)
 
 
+class SessionFlushError(Exception):
+    def __init__(self, error, committed):
+        self.error = error
+        # labels of the operations sent before the failure, e.g ('create', node)
+        self.committed = committed
+
+    def __str__(self):
+        msg = "Session flush failed after committing {0} operations: {1}\ncommitted: {2!r}"
+        return msg.format(len(self.committed), self.error, self.committed)
+
+
 class DataInconsistencyError(ValueError):
     def __init__(self, key, value, index, node='(unsaved)'):
         self.property_name = key
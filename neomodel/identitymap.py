@@ -0,0 +1,59 @@
+import threading
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+def current_identity_map():
+    """The identity map active in this thread, if any"""
+    return getattr(_local, 'identity_map', None)
+
+
+@contextmanager
+def identity_map():
+    """
+    Inflate each node at most once within the block, later inflations of the
+    same node id return the instance already built::
+
+        with neomodel.identity_map():
+            jim = Person.index.get(name='Jim')
+            assert jim.friends.all()[0].friends.all()[0] is jim
+
+    Wrapping a request handler gives one map per request. Nested blocks
+    share the outer map.
+    """
+    current = current_identity_map()
+    if current is not None:
+        yield current
+        return
+
+    imap = IdentityMap()
+    _local.identity_map = imap
+    try:
+        yield imap
+    finally:
+        _local.identity_map = None
+
+
+class IdentityMap(object):
+    """Node instances by node id, see identity_map()"""
+    def __init__(self):
+        self._nodes = {}
+
+    def get(self, node_id):
+        return self._nodes.get(node_id)
+
+    def add(self, node):
+        self._nodes[node.__node__._id] = node
+
+    def discard(self, node_id):
+        self._nodes.pop(node_id, None)
+
+    def clear(self):
+        self._nodes.clear()
+
+    def __contains__(self, node_id):
+        return node_id in self._nodes
+
+    def __len__(self):
+        return len(self._nodes)
@@ -1,14 +1,37 @@
 from lucenequerybuilder import Q
 from .exception import PropertyNotIndexed
 from .properties import AliasProperty
+from . import metrics
 import functools
+from weakref import WeakSet
 from py2neo import neo4j
 
+# index managers of concrete node classes, see warm_indexes
+_registry = WeakSet()
+
+
+def register_index(manager):
+    _registry.add(manager)
+
+
+def warm_indexes():
+    """Resolve the index handles of all node classes up front"""
+    for manager in list(_registry):
+        manager.__index__
+
+
+def invalidate_indexes():
+    """Drop all cached index handles, they are resolved again on next use"""
+    for manager in list(_registry):
+        manager.invalidate()
+
 
 class NodeIndexManager(object):
     def __init__(self, node_class, index_name):
         self.node_class = node_class
         self.name = index_name
+        self._index = None
+        self._index_pool = None
 
     def _check_params(self, params):
         """checked args are indexed and convert aliases"""
@@ -25,7 +48,15 @@ class NodeIndexManager(object):
                 del params[key]
 
     def _execute(self, query):
-        return self.__index__.query(query)
+        from .core import _request
+        index = self.__index__
+        with _request('index', self.node_class.__name__, query) as event:
+            nodes = list(index.query(query))
+            event['rows'] = len(nodes)
+            if metrics.active():
+                event['request_bytes'] = metrics.payload_size(query)
+                event['response_bytes'] = metrics.payload_size(nodes)
+        return nodes
 
     def search(self, query=None, **kwargs):
         """Search nodes using an via index"""
@@ -38,7 +69,10 @@ class NodeIndexManager(object):
             self._check_params(kwargs)
             query = functools.reduce(lambda x, y: x & y, [Q(k, v) for k, v in kwargs.items()])
 
-        return [self.node_class.inflate(n) for n in self._execute(str(query))]
+        nodes = self._execute(str(query))
+        with metrics.measure('inflate', self.node_class.__name__) as event:
+            event['rows'] = len(nodes)
+            return [self.node_class.inflate(n) for n in nodes]
 
     def get(self, query=None, **kwargs):
         """Load single node from index lookup"""
@@ -55,7 +89,20 @@ class NodeIndexManager(object):
         else:
             raise self.node_class.DoesNotExist("Can't find node in index matching query")
 
+    def invalidate(self):
+        """Forget the cached index handle"""
+        self._index = None
+        self._index_pool = None
+
     @property
     def __index__(self):
-        from .core import connection
-        return connection().get_or_create_index(neo4j.Node, self.name)
+        from .core import get_pool
+        pool = get_pool()
+        # handles are cached per connection pool
+        if self._index is None or self._index_pool is not pool:
+            from .core import _request
+            db = pool.checkout()
+            with _request('index', self.node_class.__name__):
+                self._index = db.get_or_create_index(neo4j.Node, self.name)
+            self._index_pool = pool
+        return self._index
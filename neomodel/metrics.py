@@ -0,0 +1,166 @@
+"""
+Client side query metrics.
+
+Each request made to the server is reported as an event, a dict with the
+keys kind ('cypher', 'batch', 'index', 'category', or 'node' and
+'relationship' for requests on a single entity), model, source, query,
+params, rows, request_bytes, response_bytes, wait, idle, duration and
+error. Inflating results is reported as kind 'inflate'.
+
+wait is the time spent getting a connection and an in flight slot from
+the pool, duration is timed from then on. For streamed queries idle is
+the time the response was left unread between rows, it isn't part of the
+duration. Sizes are those of the JSON sent and received, they are None
+when not measured.
+
+Events are passed to listeners registered with add_listener() and, when
+enabled by enable() or the NEOMODEL_METRICS environment variable,
+aggregated per kind and model class, see snapshot().
+"""
+import os
+import time
+import json
+import bisect
+import threading
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# upper bounds of the latency histogram buckets in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+# kinds that are a round trip to the server
+REQUEST_KINDS = frozenset(['cypher', 'batch', 'index', 'category', 'node', 'relationship'])
+
+clock = getattr(time, 'perf_counter', time.time)
+
+ENABLED = bool(os.environ.get('NEOMODEL_METRICS', False))
+
+_lock = threading.Lock()
+_stats = {}
+_listeners = []
+_context = threading.local()
+
+
+def enable(enabled=True):
+    """ Turn aggregation of events into the snapshot() statistics on or off """
+    global ENABLED
+    ENABLED = enabled
+
+
+def add_listener(fn):
+    """ Call fn with every event, e.g to export them to a metrics service """
+    with _lock:
+        _listeners.append(fn)
+
+
+def remove_listener(fn):
+    with _lock:
+        if fn in _listeners:
+            _listeners.remove(fn)
+
+
+def active():
+    return ENABLED or bool(_listeners)
+
+
+def _entity(value):
+    # py2neo nodes and relationships, as the server represented them
+    metadata = getattr(value, '__metadata__', None)
+    return metadata if isinstance(metadata, dict) else str(value)
+
+
+def payload_size(body):
+    """ size in bytes of a request or response body encoded as JSON, only worth computing while active """
+    try:
+        return len(json.dumps(body, separators=(',', ':'), default=_entity))
+    except (TypeError, ValueError):
+        return None
+
+
+@contextmanager
+def source(label):
+    """ Label events recorded in the block with their origin, e.g a traversal """
+    previous = getattr(_context, 'source', None)
+    _context.source = label
+    try:
+        yield
+    finally:
+        _context.source = previous
+
+
+@contextmanager
+def measure(kind, model=None, query=None, params=None):
+    """
+    Time the block and record it as an event of kind, the event dict is
+    yielded so rows, sizes and the wait may be filled in
+    """
+    event = {'kind': kind, 'model': model, 'source': getattr(_context, 'source', None),
+             'query': query, 'params': params, 'rows': None, 'request_bytes': None,
+             'response_bytes': None, 'wait': None, 'idle': None, 'duration': None, 'error': None}
+    start = clock()
+    try:
+        yield event
+    except Exception as e:
+        event['error'] = e
+        raise
+    finally:
+        event['duration'] = clock() - start - (event['idle'] or 0.0)
+        record(event)
+
+
+def record(event):
+    if ENABLED:
+        _aggregate(event)
+    for listener in list(_listeners):
+        try:
+            listener(event)
+        except Exception:
+            logger.exception("neomodel metrics listener %r failed", listener)
+
+
+def _aggregate(event):
+    key = (event['kind'], event['model'])
+    duration = event['duration']
+    with _lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = {
+                'kind': event['kind'],
+                'model': event['model'],
+                'count': 0,
+                'errors': 0,
+                'rows': 0,
+                'request_bytes': 0,
+                'response_bytes': 0,
+                'wait_time': 0.0,
+                'time': 0.0,
+                'max_time': 0.0,
+                'histogram': [0] * len(BUCKETS),
+            }
+        stats['count'] += 1
+        stats['errors'] += event['error'] is not None
+        stats['rows'] += event['rows'] or 0
+        stats['request_bytes'] += event['request_bytes'] or 0
+        stats['response_bytes'] += event['response_bytes'] or 0
+        stats['wait_time'] += event['wait'] or 0.0
+        stats['time'] += duration
+        stats['max_time'] = max(stats['max_time'], duration)
+        stats['histogram'][bisect.bisect_left(BUCKETS, duration)] += 1
+
+
+def snapshot():
+    """
+    Aggregated statistics, one dict per kind and model class with count,
+    errors, rows, request_bytes, response_bytes, wait_time, time, max_time
+    and histogram, the number of events per latency bucket in BUCKETS
+    """
+    with _lock:
+        stats = [dict(s, histogram=list(s['histogram'])) for s in _stats.values()]
+    return sorted(stats, key=lambda s: (s['kind'], s['model'] or ''))
+
+
+def reset():
+    with _lock:
+        _stats.clear()
@@ -0,0 +1,165 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from py2neo import neo4j
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+def reset_http_connections():
+    """
+    Forget the sockets held by httpstream, py2neo's HTTP layer, e.g after a
+    fork so the child doesn't write to connections it shares with its parent
+    """
+    try:
+        from py2neo.packages.httpstream.http import ConnectionPool as HTTPConnectionPool
+    except ImportError:
+        return
+    puddles = getattr(HTTPConnectionPool, '_puddles', None)
+    if puddles is not None:
+        puddles.clear()
+
+
+class _Checkout(object):
+    """Holds a thread's connection, handed back to the pool when the thread exits"""
+    def __init__(self, pool, db):
+        self.pool = pool
+        self.db = db
+
+    def __del__(self):
+        if self.db is not None:
+            try:
+                self.pool._checkin(self.db)
+            except Exception:  # interpreter shutdown
+                pass
+
+
+class ConnectionPool(object):
+    """
+    A bounded pool of GraphDatabaseService instances.
+
+    Each thread checks out its own connection on first use and keeps it until
+    release() is called or the thread exits. When size is set, threads beyond
+    it wait (up to timeout seconds) for a connection to be released. A
+    connection is a service handle, the sockets underneath are opened and
+    kept alive by httpstream, so size bounds the threads using the server
+    rather than the sockets.
+
+    The number of HTTP requests in flight at once, and so of sockets in use,
+    may be limited by max_in_flight, further requests queue (again up to
+    timeout seconds) until a slot is free.
+
+    A pool belongs to the process that created it, see core.get_pool().
+    """
+    def __init__(self, url, size=None, max_in_flight=None, timeout=None, factory=None):
+        self.url = url
+        self.size = size
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._factory = factory or neo4j.GraphDatabaseService
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._slot_free = threading.Condition(self._lock)
+        self._local = threading.local()
+        self._idle = []
+        self._stats = {
+            'created': 0,
+            'checked_out': 0,
+            'requests': 0,
+            'in_flight': 0,
+            'queued': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+        }
+
+    def checkout(self):
+        """Return the connection bound to the current thread"""
+        checkout = getattr(self._local, 'checkout', None)
+        if checkout is not None:
+            return checkout.db
+
+        deadline = None if self.timeout is None else time.time() + self.timeout
+        with self._available:
+            while not self._idle and self.size and self._stats['created'] >= self.size:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise PoolTimeout("No connection available to {0} after {1}s".format(
+                        self.url, self.timeout))
+                self._stats['waits'] += 1
+                self._available.wait(remaining)
+            if self._idle:
+                db = self._idle.pop()
+            else:
+                db = None
+                self._stats['created'] += 1
+            self._stats['checked_out'] += 1
+
+        if db is None:
+            try:
+                db = self._factory(self.url)
+            except Exception:
+                with self._available:
+                    self._stats['created'] -= 1
+                    self._stats['checked_out'] -= 1
+                    self._available.notify()
+                raise
+        self._local.checkout = _Checkout(self, db)
+        return db
+
+    def release(self):
+        """Hand the current thread's connection back to the pool"""
+        checkout = getattr(self._local, 'checkout', None)
+        if checkout is not None:
+            db, checkout.db = checkout.db, None
+            del self._local.checkout
+            self._checkin(db)
+
+    def _checkin(self, db):
+        if os.getpid() != self.pid:
+            return
+        with self._available:
+            self._idle.append(db)
+            self._stats['checked_out'] -= 1
+            self._available.notify()
+
+    @contextmanager
+    def request(self):
+        """
+        Hold one of the in flight slots for the duration of a HTTP request.
+        Check out the connection first, a thread holding a slot never waits
+        for a connection.
+        """
+        start = time.time()
+        deadline = None if self.timeout is None else start + self.timeout
+        with self._lock:
+            self._stats['queued'] += 1
+            try:
+                while self.max_in_flight and self._stats['in_flight'] >= self.max_in_flight:
+                    remaining = None if deadline is None else deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        raise PoolTimeout("No request slot free for {0} after {1}s".format(
+                            self.url, self.timeout))
+                    self._slot_free.wait(remaining)
+            finally:
+                self._stats['queued'] -= 1
+            self._stats['in_flight'] += 1
+            self._stats['requests'] += 1
+            if self.max_in_flight:
+                self._stats['wait_time'] += time.time() - start
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._stats['in_flight'] -= 1
+                self._slot_free.notify()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+        stats.update({'size': self.size, 'max_in_flight': self.max_in_flight})
+        return stats
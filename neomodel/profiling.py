@@ -0,0 +1,103 @@
+"""
+Round trip budgets and N+1 detection, built on metrics events.
+
+Only requests made by the thread entering the block are considered.
+"""
+import threading
+import warnings
+from contextlib import contextmanager
+from . import metrics
+
+DEFAULT_N_PLUS_ONE_THRESHOLD = 10
+
+
+class NPlusOneWarning(UserWarning):
+    pass
+
+
+class QueryCounter(object):
+    """ Collects the request events of the thread that created it """
+    def __init__(self):
+        self.events = []
+        self._thread = threading.current_thread()
+
+    @property
+    def count(self):
+        return len(self.events)
+
+    def __call__(self, event):
+        if event['kind'] in metrics.REQUEST_KINDS and threading.current_thread() is self._thread:
+            self.events.append(event)
+
+    def summary(self):
+        lines = []
+        for event in self.events:
+            query = (event['query'] or '').strip().split('\n')[0]
+            lines.append("  {0} {1}: {2}".format(event['kind'], event['source'] or event['model'], query))
+        return "\n".join(lines)
+
+
+@contextmanager
+def count_queries():
+    """
+    Count the requests to the server made in the block::
+
+        with count_queries() as counter:
+            jim.friends.all()
+        assert counter.count == 1
+    """
+    counter = QueryCounter()
+    metrics.add_listener(counter)
+    try:
+        yield counter
+    finally:
+        metrics.remove_listener(counter)
+
+
+@contextmanager
+def assert_max_queries(n):
+    """ Raise AssertionError if the block makes more than n requests """
+    with count_queries() as counter:
+        yield counter
+    if counter.count > n:
+        raise AssertionError("{0} requests made, at most {1} expected\n{2}".format(
+            counter.count, n, counter.summary()))
+
+
+class NPlusOneDetector(object):
+    """ Spots the same cypher query repeated for threshold different start nodes """
+    def __init__(self, threshold=DEFAULT_N_PLUS_ONE_THRESHOLD):
+        self.threshold = threshold
+        self.reported = []
+        self._starts = {}
+        self._thread = threading.current_thread()
+
+    def __call__(self, event):
+        params = event['params']
+        if event['kind'] != 'cypher' or not params or 'self' not in params:
+            return
+        if threading.current_thread() is not self._thread:
+            return
+        starts = self._starts.setdefault(event['query'], set())
+        starts.add(params['self'])
+        if len(starts) == self.threshold:
+            self.reported.append(event)
+            warnings.warn("Same query run for {0} different nodes by {1}, consider "
+                          "TraversalSet.prefetch:\n{2}".format(
+                              self.threshold, event['source'] or event['model'], event['query']),
+                          NPlusOneWarning)
+
+
+@contextmanager
+def detect_n_plus_one(threshold=DEFAULT_N_PLUS_ONE_THRESHOLD):
+    """
+    Warn with NPlusOneWarning when a traversal, or any other query with a
+    self parameter, runs for threshold different start nodes in the block,
+    typically RelationshipManager.all() called in a loop
+    """
+    detector = NPlusOneDetector(threshold)
+    metrics.add_listener(detector)
+    try:
+        yield detector
+    finally:
+        metrics.remove_listener(detector)
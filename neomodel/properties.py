@@ -14,17 +14,56 @@ if sys.version_info >= (3, 0):
     unicode = lambda x: str(x)
 
 
+class ClassSchema(object):
+    """
+    Precompiled description of the properties and relationships of a node or
+    relationship class, built once by the metaclass at class creation.
+
+    Pairs are stored as tuples of (name, definition) in inheritance order.
+    """
+    __slots__ = ('properties', 'aliases', 'relationships', 'defaults',
+                 'required', 'indexed', 'unique_indexed', 'names',
+                 'inflater', 'deflater')
+
+    def __init__(self, cls):
+        attrs, order = {}, []
+        # reverse is done to keep inheritance order
+        for scls in reversed(cls.mro()):
+            for key, value in scls.__dict__.items():
+                if key not in attrs:
+                    order.append(key)
+                attrs[key] = value
+
+        properties, aliases, relationships = [], [], []
+        for key in order:
+            value = attrs[key]
+            if isinstance(value, AliasProperty):
+                aliases.append((key, value))
+            elif isinstance(value, Property):
+                properties.append((key, value))
+            elif isinstance(value, RelationshipDefinition):
+                relationships.append((key, value))
+
+        self.properties = tuple(properties)
+        self.aliases = tuple(aliases)
+        self.relationships = tuple(relationships)
+        self.defaults = tuple((k, p) for k, p in properties if p.has_default)
+        self.required = frozenset(k for k, p in properties if p.required)
+        self.indexed = frozenset(k for k, p in properties if p.index)
+        self.unique_indexed = frozenset(k for k, p in properties if p.unique_index)
+        self.names = frozenset(k for k, _ in properties + aliases)
+        # generated on first use, see _build_inflater and _build_deflater
+        self.inflater = None
+        self.deflater = None
+
+
 class PropertyManager(object):
     """Common stuff for handling properties in nodes and relationships"""
     def __init__(self, *args, **kwargs):
-        for key, val in self._class_properties().items():
-            if val.__class__ is RelationshipDefinition:
-                self.__dict__[key] = val.build_manager(self, key)
-            # handle default values
-            elif isinstance(val, (Property,)) and not isinstance(val, (AliasProperty,)):
-                if not key in kwargs or kwargs[key] is None:
-                    if val.has_default:
-                        kwargs[key] = val.default_value()
+        # handle default values
+        for key, prop in self.__schema__.defaults:
+            if kwargs.get(key) is None:
+                kwargs[key] = prop.default_value()
         for key, value in kwargs.items():
             if not(key.startswith("__") and key.endswith("__")):
                 setattr(self, key, value)
@@ -42,17 +81,18 @@ class PropertyManager(object):
     @classmethod
     def deflate(cls, obj_props, obj=None):
         """ deflate dict ready to be stored """
-        deflated = {}
-        for key, prop in cls._class_properties().items():
-            if (not isinstance(prop, AliasProperty)
-                    and issubclass(prop.__class__, Property)):
-                if key in obj_props and obj_props[key] is not None:
-                    deflated[key] = prop.deflate(obj_props[key], obj)
-                elif prop.has_default:
-                    deflated[key] = prop.deflate(prop.default_value(), obj)
-                elif prop.required:
-                    raise RequiredProperty(key, cls)
-        return deflated
+        schema = cls.__schema__
+        if schema.deflater is None:
+            schema.deflater = _build_deflater(cls)
+        return schema.deflater(obj_props, obj)
+
+    @classmethod
+    def _inflate_instance(cls, data, obj):
+        """ build a new instance from the raw property data of obj """
+        schema = cls.__schema__
+        if schema.inflater is None:
+            schema.inflater = _build_inflater(cls)
+        return schema.inflater(data, obj)
 
     @classmethod
     def get_property(cls, name):
@@ -65,16 +105,6 @@ class PropertyManager(object):
             NoSuchProperty(name, cls)
         return neo_property
 
-    @classmethod
-    def _class_properties(cls):
-        # get all dict values for inherited classes
-        # reverse is done to keep inheritance order
-        props = {}
-        for scls in reversed(cls.mro()):
-            for key, value in scls.__dict__.items():
-                props[key] = value
-        return props
-
 
 def validator(fn):
     fn_name = fn.func_name if hasattr(fn, 'func_name') else fn.__name__
@@ -91,9 +121,102 @@ def validator(fn):
             return fn(self, value)
         except Exception as e:
             raise exc_class(self.name, self.owner, str(e), obj)
+    # exposed for the generated inflate / deflate functions
+    validator._unvalidated = fn
     return validator
 
 
+def _has_plain_init(cls):
+    """ true if nothing between cls and PropertyManager overrides __init__ """
+    for scls in cls.__mro__:
+        if scls is PropertyManager:
+            return True
+        if '__init__' in scls.__dict__:
+            return False
+    return True
+
+
+def _convert_stmt(lines, namespace, i, method, prop, value, exc_class):
+    """ append a statement converting value, raising exc_class on failure """
+    namespace['p%d' % i] = prop
+    fn = getattr(getattr(prop.__class__, method), '_unvalidated', None)
+    if fn is None:
+        # not wrapped by @validator, call as is
+        lines.append("    result = p{0}.{1}({2}, obj)".format(i, method, value))
+        return
+    namespace['f%d' % i] = fn
+    lines.append("    try:")
+    lines.append("        result = f{0}(p{0}, {1})".format(i, value))
+    lines.append("    except Exception as e:")
+    lines.append("        raise {0}(p{1}.name, p{1}.owner, str(e), obj)".format(
+        exc_class.__name__, i))
+
+
+def _compile(cls, name, lines, namespace):
+    code = compile("\n".join(lines) + "\n",
+                   "<neomodel {0} {1}>".format(name, cls.__name__), 'exec')
+    exec(code, namespace)
+    return namespace[name]
+
+
+def _build_inflater(cls):
+    """
+    Generate a straight line function converting the raw data of a node
+    or relationship into a new instance of cls.
+    """
+    schema = cls.__schema__
+    namespace = {'cls': cls, 'InflateError': InflateError}
+    lines = ["def inflate(data, obj):", "    props = {}"]
+    for i, (key, prop) in enumerate(schema.properties):
+        lines.append("    if {0!r} in data:".format(key))
+        body = []
+        _convert_stmt(body, namespace, i, 'inflate', prop, "data[{0!r}]".format(key), InflateError)
+        lines.extend("    " + line for line in body)
+        lines.append("        props[{0!r}] = result".format(key))
+        lines.append("    else:")
+        if prop.has_default:
+            lines.append("        props[{0!r}] = p{1}.default_value()".format(key, i))
+        else:
+            lines.append("        props[{0!r}] = None".format(key))
+
+    if _has_plain_init(cls):
+        # skip __init__, defaults have been applied above
+        lines.append("    inst = cls.__new__(cls)")
+        lines.append("    inst.__dict__.update(props)")
+        lines.append("    return inst")
+    else:
+        lines.append("    return cls(**props)")
+    return _compile(cls, 'inflate', lines, namespace)
+
+
+def _build_deflater(cls):
+    """
+    Generate a straight line function converting a dict of property
+    values into a dict ready to be stored.
+    """
+    schema = cls.__schema__
+    namespace = {'cls': cls, 'DeflateError': DeflateError,
+                 'RequiredProperty': RequiredProperty}
+    lines = ["def deflate(obj_props, obj=None):", "    deflated = {}"]
+    for i, (key, prop) in enumerate(schema.properties):
+        lines.append("    value = obj_props.get({0!r})".format(key))
+        if prop.has_default:
+            lines.append("    if value is None:")
+            lines.append("        value = p{0}.default_value()".format(i))
+        elif prop.required:
+            lines.append("    if value is None:")
+            lines.append("        raise RequiredProperty({0!r}, cls)".format(key))
+        else:
+            lines.append("    if value is not None:")
+        body = []
+        _convert_stmt(body, namespace, i, 'deflate', prop, "value", DeflateError)
+        body.append("    deflated[{0!r}] = result".format(key))
+        indent = "    " if not (prop.has_default or prop.required) else ""
+        lines.extend(indent + line for line in body)
+    lines.append("    return deflated")
+    return _compile(cls, 'deflate', lines, namespace)
+
+
 class Property(object):
     def __init__(self, unique_index=False, index=False, required=False, default=None):
         if default and required:
@@ -0,0 +1,105 @@
+"""
+Aggregate statistics per cypher query fingerprint, the query text with
+literals replaced by ? and whitespace collapsed.
+
+Collection starts with enable() or the NEOMODEL_QUERY_STATS environment
+variable and lasts for the life of the process, see snapshot() and dumps().
+"""
+import os
+import re
+import json
+import threading
+from collections import deque
+from . import metrics
+
+# fingerprints tracked, later ones are counted under OTHER
+MAX_FINGERPRINTS = 1000
+# latencies kept per fingerprint for percentiles
+SAMPLE_SIZE = 1000
+OTHER = '<other>'
+
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r'\s+')
+
+_lock = threading.Lock()
+_stats = {}
+_fingerprints = {}
+
+
+def fingerprint(query):
+    """ query text with literals stripped, queries differing only in values share it """
+    fp = _fingerprints.get(query)
+    if fp is None:
+        fp = _WHITESPACE.sub(' ', _LITERALS.sub('?', query)).strip()
+        if len(_fingerprints) >= MAX_FINGERPRINTS * 10:
+            _fingerprints.clear()
+        _fingerprints[query] = fp
+    return fp
+
+
+def enable():
+    # calling enable() again must not count queries twice
+    metrics.remove_listener(_record)
+    metrics.add_listener(_record)
+
+
+def disable():
+    metrics.remove_listener(_record)
+
+
+def _record(event):
+    if event['kind'] != 'cypher' or not event['query']:
+        return
+    fp = fingerprint(event['query'])
+    with _lock:
+        stats = _stats.get(fp)
+        if stats is None:
+            if len(_stats) >= MAX_FINGERPRINTS:
+                fp = OTHER
+                stats = _stats.get(fp)
+            if stats is None:
+                stats = _stats[fp] = {'calls': 0, 'errors': 0, 'rows': 0, 'total_time': 0.0,
+                                      'max_time': 0.0, 'samples': deque(maxlen=SAMPLE_SIZE)}
+        stats['calls'] += 1
+        stats['errors'] += event['error'] is not None
+        stats['rows'] += event['rows'] or 0
+        stats['total_time'] += event['duration']
+        stats['max_time'] = max(stats['max_time'], event['duration'])
+        stats['samples'].append(event['duration'])
+
+
+def _percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def snapshot():
+    """
+    One dict per fingerprint with calls, errors, rows, total_time, mean_time,
+    max_time and p99_time, most total time first. p99_time is taken from the
+    last SAMPLE_SIZE calls.
+    """
+    with _lock:
+        items = [(fp, dict(s, samples=list(s['samples']))) for fp, s in _stats.items()]
+    result = []
+    for fp, s in items:
+        samples = s.pop('samples')
+        s['fingerprint'] = fp
+        s['mean_time'] = s['total_time'] / s['calls']
+        s['p99_time'] = _percentile(samples, 0.99)
+        result.append(s)
+    return sorted(result, key=lambda s: s['total_time'], reverse=True)
+
+
+def dumps(**kwargs):
+    """ snapshot() as JSON, keyword arguments are passed to json.dumps """
+    return json.dumps(snapshot(), **kwargs)
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+if os.environ.get('NEOMODEL_QUERY_STATS'):
+    enable()
@@ -1,4 +1,4 @@
-from .properties import Property, PropertyManager, AliasProperty
+from .properties import Property, PropertyManager, ClassSchema
 
 
 class RelationshipMeta(type):
@@ -14,6 +14,7 @@ class RelationshipMeta(type):
                 # support for 'magic' properties
                 if hasattr(value, 'setup') and hasattr(value.setup, '__call__'):
                     value.setup()
+        inst.__schema__ = ClassSchema(inst)
         return inst
 
 
@@ -21,35 +22,31 @@ StructuredRelBase = RelationshipMeta('RelationshipBase', (PropertyManager,), {})
 
 
 class StructuredRel(StructuredRelBase):
-    def __init__(self, *args, **kwargs):
-        super(StructuredRel, self).__init__(*args, **kwargs)
-
     def save(self):
+        from .core import _request
         props = self.deflate(self.__properties__, self.__relationship__)
-        self.__relationship__.set_properties(props)
+        with _request('relationship', self.__class__.__name__):
+            self.__relationship__.set_properties(props)
         return self
 
     def delete(self):
         raise Exception("Can not delete relationships please use 'disconnect'")
 
     def start_node(self):
-        return self._start_node_class.inflate(self.__relationship__.start_node)
+        return self._fetch_node(self._start_node_class, 'start_node')
 
     def end_node(self):
-        return self._end_node_class.inflate(self.__relationship__.end_node)
+        return self._fetch_node(self._end_node_class, 'end_node')
+
+    def _fetch_node(self, cls, end):
+        from .core import _request
+        with _request('node', cls.__name__):
+            node = getattr(self.__relationship__, end)
+            node.__metadata__  # loads the node, inside the timed block
+        return cls.inflate(node)
 
     @classmethod
     def inflate(cls, rel):
-        props = {}
-        for key, prop in cls._class_properties().items():
-            if (issubclass(prop.__class__, Property)
-                    and not isinstance(prop, AliasProperty)):
-                if key in rel.__metadata__['data']:
-                    props[key] = prop.inflate(rel.__metadata__['data'][key], obj=rel)
-                elif prop.has_default:
-                    props[key] = prop.default_value()
-                else:
-                    props[key] = None
-        srel = cls(**props)
+        srel = cls._inflate_instance(rel.__metadata__['data'], rel)
         srel.__relationship__ = rel
         return srel
@@ -2,10 +2,13 @@ import sys
 import functools
 from importlib import import_module
 from .exception import DoesNotExist, NotConnected
-from .util import camel_to_upper
+from .util import camel_to_upper, CustomBatch, _cypher_rows
+from .unitofwork import current_session
 
 OUTGOING, INCOMING, EITHER = 1, -1, 0
 
+CONNECT_BATCH_SIZE = 500
+
 
 # check origin node is saved and not deleted
 def check_origin(fn):
@@ -31,6 +34,9 @@ def rel_helper(**rel):
 
 
 class RelationshipManager(object):
+    # related nodes loaded by TraversalSet.prefetch, cleared on write
+    _prefetched = None
+
     def __init__(self, definition, origin):
         self.direction = definition['direction']
         self.relation_type = definition['relation_type']
@@ -51,14 +57,16 @@ class RelationshipManager(object):
 
     @check_origin
     def __bool__(self):
-        return len(self) > 0
+        return self.exists()
 
     @check_origin
     def __nonzero__(self):
-        return len(self) > 0
+        return self.exists()
 
     @check_origin
     def __len__(self):
+        if self._prefetched is not None:
+            return len(self._prefetched)
         return len(self.origin.traverse(self.name))
 
     @property
@@ -69,8 +77,22 @@ class RelationshipManager(object):
     def count(self):
         return self.__len__()
 
+    @check_origin
+    def exists(self):
+        if self._prefetched is not None:
+            return bool(self._prefetched)
+        return self.origin.traverse(self.name).exists()
+
+    @check_origin
+    def first(self):
+        if self._prefetched is not None:
+            return self._prefetched[0] if self._prefetched else None
+        return self.origin.traverse(self.name).first()
+
     @check_origin
     def all(self):
+        if self._prefetched is not None:
+            return list(self._prefetched)
         return self.origin.traverse(self.name).run()
 
     @check_origin
@@ -102,7 +124,8 @@ class RelationshipManager(object):
         """check for valid target node i.e correct class and is saved"""
         for rel_type, cls in self.target_map.items():
             if obj.__class__ is cls:
-                if obj.__node__ is None:
+                session = current_session()
+                if obj.__node__ is None and not (session and session.is_pending(obj)):
                     raise Exception("Can't preform operation on unsaved node " + repr(obj))
                 return
 
@@ -115,10 +138,74 @@ class RelationshipManager(object):
     @check_origin
     def connect(self, obj, properties=None):
         self._check_node(obj)
+        self._prefetched = None
+        session = current_session()
+        if session is not None:
+            return session.connect(self, obj, properties)
+
+        q, params, rel_instance = self._connect_query(obj, properties)
+        params['them'] = obj.__node__._id
+        result = self.origin.cypher(q, params)
+        if rel_instance is not None:
+            rel_instance.__relationship__ = result[0][0][0]
+            return rel_instance
 
+    @check_origin
+    def connect_many(self, nodes, properties=None, batch_size=CONNECT_BATCH_SIZE):
+        """connect to all nodes, batch_size nodes per request, properties may be one
+        dict for every relationship or a list of dicts, one per node"""
+        nodes, properties = self._many_args(nodes, properties)
+        session = current_session()
+        if session is not None:
+            return [session.connect(self, obj, props) for obj, props in zip(nodes, properties)]
+        return self._connect_many(nodes, properties, batch_size=batch_size)
+
+    def _many_args(self, nodes, properties):
+        nodes = list(nodes)
+        if properties is None or isinstance(properties, dict):
+            properties = [properties] * len(nodes)
+        elif len(properties) != len(nodes):
+            raise ValueError("Expected {0} property dicts got {1}".format(len(nodes), len(properties)))
+        for obj in nodes:
+            self._check_node(obj)
+        return nodes, properties
+
+    def _connect_many(self, nodes, properties, exclusive=False, batch_size=CONNECT_BATCH_SIZE):
+        """returns the relationship model instances, or relationships if there is
+        no model, in order. None where an exclusive connect was refused"""
+        self._prefetched = None
+        results = []
+        for start in range(0, len(nodes), batch_size):
+            batch = CustomBatch(self.client, None, model=self.origin.__class__.__name__)
+            rel_instances = []
+            for obj, props in zip(nodes[start:start + batch_size], properties[start:start + batch_size]):
+                q, params, rel_instance = self._connect_query(obj, props, exclusive)
+                if rel_instance is None:
+                    q += " RETURN r"
+                params.update({'self': self.origin.__node__._id, 'them': obj.__node__._id})
+                batch.append_cypher(q, params)
+                rel_instances.append(rel_instance)
+
+            for response, rel_instance in zip(batch.submit_responses(), rel_instances):
+                rows = _cypher_rows(response)
+                rel = rows[0][0] if rows else None
+                if rel is not None and rel_instance is not None:
+                    rel_instance.__relationship__ = rel
+                    rel = rel_instance
+                results.append(rel)
+        return results
+
+    def _connect_query(self, obj, properties=None, exclusive=False):
+        """build the query connecting to obj, returns the query, its params and
+        the relationship model instance if one is defined. An exclusive query
+        only connects if there is no existing relationship"""
         new_rel = rel_helper(lhs='us', rhs='them', ident='r', **self.definition)
-        q = "START them=node({them}), us=node({self}) CREATE UNIQUE " + new_rel
-        params = {'them': obj.__node__._id}
+        q = "START them=node({them}), us=node({self}) "
+        if exclusive:
+            existing = rel_helper(lhs='us', rhs='', ident='e?', **self.definition)
+            q += "MATCH " + existing + " WITH us, them, count(e) AS existing WHERE existing = 0 "
+        q += "CREATE UNIQUE " + new_rel
+        params = {}
 
         # set propeties via rel model
         if self.definition['model']:
@@ -135,15 +222,14 @@ class RelationshipManager(object):
             for p, v in rel_model.deflate(rel_instance.__properties__).items():
                 params['place_holder_' + p] = v
                 q += " SET r." + p + " = {place_holder_" + p + "}"
-            rel_instance.__relationship__ = self.origin.cypher(q + " RETURN r", params)[0][0][0]
-            return rel_instance
+            return q + " RETURN r", params, rel_instance
 
         # OR.. set properties schemaless
         if properties:
             for p, v in properties.items():
                 params['place_holder_' + p] = v
                 q += " SET r." + p + " = {place_holder_" + p + "}"
-        self.origin.cypher(q, params)
+        return q, params, None
 
     @check_origin
     def relationship(self, obj):
@@ -175,6 +261,7 @@ class RelationshipManager(object):
         """reconnect: old_node, new_node"""
         self._check_node(old_obj)
         self._check_node(new_obj)
+        self._prefetched = None
         if old_obj.__node__._id == new_obj.__node__._id:
             return
         old_rel = rel_helper(lhs='us', rhs='old', ident='r', **self.definition)
@@ -201,12 +288,20 @@ class RelationshipManager(object):
 
     @check_origin
     def disconnect(self, obj):
+        self._prefetched = None
+        session = current_session()
+        if session is not None:
+            return session.disconnect(self, obj)
+        self.origin.cypher(self._disconnect_query(), {'them': obj.__node__._id})
+
+    def _disconnect_query(self):
         rel = rel_helper(lhs='a', rhs='b', ident='r', **self.definition)
-        q = "START a=node({self}), b=node({them}) MATCH " + rel + " DELETE r"
-        self.origin.cypher(q, {'them': obj.__node__._id})
+        return "START a=node({self}), b=node({them}) MATCH " + rel + " DELETE r"
 
     @check_origin
     def single(self):
+        if self._prefetched is not None:
+            return self._prefetched[0] if self._prefetched else None
         nodes = self.origin.traverse(self.name).limit(1).run()
         return nodes[0] if nodes else None
 
@@ -221,6 +316,16 @@ class RelationshipDefinition(object):
         self.definition['relation_type'] = relation_type
         self.definition['direction'] = direction
         self.definition['model'] = model
+        self.name = None
+        self._target_map = None
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        # build the manager on first access and keep it on the instance
+        manager = self.build_manager(obj, self.name)
+        obj.__dict__[self.name] = manager
+        return manager
 
     def _lookup(self, name):
         if name.find('.') == -1:
@@ -252,18 +357,24 @@ class RelationshipDefinition(object):
                 module = import_module(namespace).__name__
         return getattr(sys.modules[module], name)
 
-    def build_manager(self, origin, name):
-        # get classes for target
-        if isinstance(self.node_class, list):
-            node_classes = [self._lookup(cls) if isinstance(cls, (str,)) else cls
-                        for cls in self.node_class]
-        else:
-            node_classes = [self._lookup(self.node_class)
-                if isinstance(self.node_class, (str,)) else self.node_class]
+    @property
+    def target_map(self):
+        """ map of relationship type to target class, resolved once """
+        if self._target_map is None:
+            # get classes for target
+            if isinstance(self.node_class, list):
+                node_classes = [self._lookup(cls) if isinstance(cls, (str,)) else cls
+                            for cls in self.node_class]
+            else:
+                node_classes = [self._lookup(self.node_class)
+                    if isinstance(self.node_class, (str,)) else self.node_class]
 
-        # build target map
-        self.definition['target_map'] = dict(zip([camel_to_upper(c.__name__)
-                for c in node_classes], node_classes))
+            self._target_map = dict(zip([camel_to_upper(c.__name__)
+                    for c in node_classes], node_classes))
+        return self._target_map
+
+    def build_manager(self, origin, name):
+        self.definition['target_map'] = self.target_map
         rel = self.manager(self.definition, origin)
         rel.name = name
         return rel
@@ -17,12 +17,3 @@ def exec_hook(hook_name, self, *args, **kwargs):
         sig = getattr(signals, hook_name)
         sig.send(sender=self.__class__, instance=self)
 
-
-def hooks(fn):
-    def hooked(self, *args, **kwargs):
-        fn_name = fn.func_name if hasattr(fn, 'func_name') else fn.__name__
-        exec_hook('pre_' + fn_name, self, *args, **kwargs)
-        val = fn(self, *args, **kwargs)
-        exec_hook('post_' + fn_name, self, *args, **kwargs)
-        return val
-    return hooked
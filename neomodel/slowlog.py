@@ -0,0 +1,85 @@
+"""
+Slow query log.
+
+Requests taking longer than the configured threshold are kept in a bounded
+buffer, see entries(), and logged as warnings to the 'neomodel.slowlog'
+logger. Set a threshold in seconds with configure() or the
+NEOMODEL_SLOW_QUERY_THRESHOLD environment variable.
+"""
+import os
+import time
+import threading
+import logging
+from collections import deque
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZE = 100
+DEFAULT_KINDS = ('cypher', 'batch', 'index', 'node', 'relationship')
+
+_lock = threading.Lock()
+_entries = deque(maxlen=DEFAULT_SIZE)
+_redactors = []
+_threshold = None
+_kinds = frozenset(DEFAULT_KINDS)
+
+
+def configure(threshold, size=DEFAULT_SIZE, kinds=DEFAULT_KINDS):
+    """
+    Record requests of the given kinds taking longer than threshold seconds,
+    keeping the last size of them. A threshold of None turns the log off.
+    """
+    global _threshold, _entries, _kinds
+    with _lock:
+        _threshold = threshold
+        _kinds = frozenset(kinds)
+        if _entries.maxlen != size:
+            _entries = deque(_entries, maxlen=size)
+    metrics.remove_listener(_record)
+    if threshold is not None:
+        metrics.add_listener(_record)
+
+
+def add_redactor(fn):
+    """
+    fn is called with the parameters of each slow query and returns the
+    parameters to record in their place, e.g with passwords masked
+    """
+    _redactors.append(fn)
+
+
+def remove_redactor(fn):
+    if fn in _redactors:
+        _redactors.remove(fn)
+
+
+def entries():
+    """ Recorded slow queries, oldest first """
+    with _lock:
+        return list(_entries)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def _record(event):
+    threshold = _threshold
+    if threshold is None or event['kind'] not in _kinds or event['duration'] < threshold:
+        return
+    params = event['params']
+    if params is not None:
+        for redact in list(_redactors):
+            params = redact(params)
+    entry = dict(event, params=params, time=time.time())
+    with _lock:
+        _entries.append(entry)
+    logger.warning("slow %s request by %s took %.3fs, %s rows, %s bytes sent, %s bytes received\n%s\nparams: %r",
+                   entry['kind'], entry['source'] or entry['model'], entry['duration'],
+                   entry['rows'], entry['request_bytes'], entry['response_bytes'], entry['query'], params)
+
+
+if os.environ.get('NEOMODEL_SLOW_QUERY_THRESHOLD'):
+    configure(float(os.environ['NEOMODEL_SLOW_QUERY_THRESHOLD']))
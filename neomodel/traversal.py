@@ -1,6 +1,12 @@
 from .relationship_manager import RelationshipDefinition, rel_helper, INCOMING
-from copy import deepcopy
+from . import metrics
 import re
+import json
+import base64
+
+# rendered queries by ast shape, see Query
+RENDER_CACHE_SIZE = 1024
+_render_cache = {}
 
 
 def _deflate_node_value(target_map, prop, value):
@@ -27,13 +33,69 @@ def _deflate_node_value(target_map, prop, value):
 
 
 def last_x_in_ast(ast, x):
+    return ast[_last_x_index(ast, x)]
+
+
+def _last_x_index(ast, x):
     assert isinstance(ast, (list,))
-    for node in reversed(ast):
-        if x in node:
-            return node
+    for i in range(len(ast) - 1, -1, -1):
+        if x in ast[i]:
+            return i
     raise IndexError("Could not find {0} in {1}".format(x, ast))
 
 
+def _model_names(target_map):
+    return ','.join(sorted(cls.__name__ for cls in target_map.values()))
+
+
+def _labelled(label, rows):
+    # only label while fetching, code consuming the rows may run queries of its own
+    rows = iter(rows)
+    while True:
+        with metrics.source(label):
+            try:
+                row = next(rows)
+            except StopIteration:
+                return
+        yield row
+
+
+def encode_cursor(value, node_id):
+    """opaque keyset cursor from the deflated order value and node id"""
+    data = json.dumps([value, node_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        value, node_id = json.loads(base64.urlsafe_b64decode(str(cursor)).decode('utf-8'))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor {0!r}".format(cursor))
+    return value, int(node_id)
+
+
+def ast_shape(ast):
+    """hashable key for everything in ast that is rendered to the query"""
+    shape = []
+    for entry in ast:
+        if 'start' in entry:
+            shape.append(('start', entry['start']))
+        elif 'match' in entry:
+            shape.append(('match',) + tuple((rel['lhs'], rel['direction'], rel['relation_type'],
+                                            rel.get('ident', ''), rel['rhs']) for rel in entry['match']))
+        elif 'where' in entry:
+            shape.append(('where',) + tuple(entry['where']))
+        elif 'return' in entry:
+            shape.append(('return',) + tuple(entry['return']))
+        elif 'skip' in entry:
+            shape.append(('skip',))
+        elif 'limit' in entry:
+            shape.append(('limit',))
+        elif 'order' in entry:
+            shape.append(('order', entry['order'], entry['desc'], entry.get('then')))
+    return tuple(shape)
+
+
 def unique_placeholder(placeholder, query_params):
         i = 0
         new_placeholder = "{}_{}".format(placeholder, i)
@@ -43,12 +105,65 @@ def unique_placeholder(placeholder, query_params):
         return new_placeholder
 
 
+def prefetch_related(nodes, *lookups):
+    """
+    Fetch the relationships named in lookups for all nodes at once, one query per
+    relationship and node class. Nested relationships are separated by '__', e.g
+    'friends__employer'. Related nodes are attached to the relationship managers
+    of each node so all() is served from memory.
+    """
+    tree = {}
+    for lookup in lookups:
+        branch = tree
+        for name in lookup.split('__'):
+            branch = branch.setdefault(name, {})
+    _prefetch_tree(nodes, tree)
+    return nodes
+
+
+def _prefetch_tree(nodes, tree):
+    for name, subtree in tree.items():
+        related = _prefetch_relationship(nodes, name)
+        if subtree and related:
+            _prefetch_tree(related, subtree)
+
+
+def _prefetch_relationship(nodes, name):
+    by_class = {}
+    for node in nodes:
+        by_class.setdefault(node.__class__, []).append(node)
+
+    # related nodes by id, each inflated once
+    related = {}
+    for cls, cls_nodes in by_class.items():
+        definition = getattr(cls, name, None)
+        if not isinstance(definition, RelationshipDefinition):
+            raise AttributeError("{0} class has no relationship definition '{1}' to prefetch.".format(
+                cls.__name__, name))
+        target_map = definition.target_map
+        query = "START origin=node({ids})\nMATCH\n" \
+            + rel_helper(lhs='origin', rhs='them', ident='r', **definition.definition) + ",\n" \
+            + rel_helper(lhs='them', rhs='', ident='c', direction=INCOMING,
+                    relation_type="|".join(target_map)) \
+            + "\nWHERE c.__instance__! = true\nRETURN id(origin), them, c"
+        found = dict((node.__node__._id, []) for node in cls_nodes)
+        results, meta = cls_nodes[0].cypher(query, {'ids': list(found)})
+        for origin_id, node, category_rel in results:
+            if node._id not in related:
+                related[node._id] = target_map[category_rel.type].inflate(node)
+            found[origin_id].append(related[node._id])
+        for node in cls_nodes:
+            getattr(node, name)._prefetched = found[node.__node__._id]
+    return list(related.values())
+
+
 class AstBuilder(object):
     """Construct AST for traversal"""
     def __init__(self, start_node):
         self.start_node = start_node
         self.ident_count = 0
         self.query_params = {}
+        self.path = []
         self.ast = [{'start': '{self}',
             'class': self.start_node.__class__, 'name': 'origin'}]
         self.origin_is_category = start_node.__class__.__name__ == 'CategoryNode'
@@ -66,30 +181,32 @@ class AstBuilder(object):
         if where_stmts and not 'model' in t:
                 raise Exception("Conditions " + repr(where_stmts) + " to traverse "
                         + rel_manager + " not allowed as no model specified on " + rel_manager)
+        self.path.append(rel_manager)
         match, where = self._build_match_ast(t, where_stmts)
         self._add_match(match)
         if where:
             self._add_where(where)
         return self
 
+    # ast entries are never modified once added, changes replace the entry so
+    # copies of the ast list taken for execution stay valid
+
     def _add_match(self, match):
         if len(self.ast) > 1:
-            node = last_x_in_ast(self.ast, 'match')
-            for rel in match['match']:
-                node['match'].append(rel)
-            # replace name and target map
-            node['name'] = match['name']
-            node['target_map'] = match['target_map']
+            i = _last_x_index(self.ast, 'match')
+            node = self.ast[i]
+            # extend match, replace name and target map
+            self.ast[i] = dict(node, match=node['match'] + match['match'],
+                               name=match['name'], target_map=match['target_map'])
         else:
             self.ast.append(match)
 
     def _add_where(self, where):
         if len(self.ast) > 2:
-            node = last_x_in_ast(self.ast, 'where')
-            for stmt in where:
-                node['where'].append(stmt)
+            i = _last_x_index(self.ast, 'where')
+            self.ast[i] = {'where': self.ast[i]['where'] + list(where)}
         else:
-            self.ast.append({'where': where})
+            self.ast.append({'where': list(where)})
 
     def _create_ident(self):
         # ident generator
@@ -138,6 +255,7 @@ class AstBuilder(object):
                 manager = getattr(cls, rel_manager)
                 if isinstance(manager, (RelationshipDefinition)):
                     p = manager.definition
+                    p['target_map'] = manager.target_map
                     p['name'] = rel_manager
                     # add to possible targets
                     targets.append(p)
@@ -182,7 +300,25 @@ class AstBuilder(object):
         self.query_params[placeholder] = value
         return " ".join([ident_prop, op, '{' + placeholder + '}'])
 
+    def _add_cursor(self, ast):
+        """restrict ast to nodes after the keyset cursor"""
+        name = last_x_in_ast(ast, 'name')['name']
+        if hasattr(self, 'order_part'):
+            ident = self.order_part['order']
+            op = '<' if self.order_part['desc'] else '>'
+            expr = "({0} {1} {{cursor_value}} OR ({0} = {{cursor_value}} AND id({2}) {1} {{cursor_id}}))".format(
+                ident, op, name)
+        else:
+            expr = "id({0}) > {{cursor_id}}".format(name)
+        try:
+            i = _last_x_index(ast, 'where')
+            ast[i] = {'where': ast[i]['where'] + [expr]}
+        except IndexError:
+            ast.insert(_last_x_index(ast, 'match') + 1, {'where': [expr]})
+
     def _add_return(self, ast):
+        if getattr(self, '_cursor', None) is not None:
+            self._add_cursor(ast)
         node = last_x_in_ast(ast, 'name')
         idents = [node['name']]
         if self.ident_count > 0:
@@ -222,84 +358,296 @@ class AstBuilder(object):
     def _add_return_count(self, ast):
         if hasattr(self, '_skip') or hasattr(self, '_limit'):
             raise NotImplemented("Can't use skip or limit with count")
+        if getattr(self, '_cursor', None) is not None:
+            self._add_cursor(ast)
         node = last_x_in_ast(ast, 'name')
         ident = ['count(' + node['name'] + ')']
-        node = last_x_in_ast(ast, 'name')
         ast.append({'return': ident})
 
-    def execute(self, ast):
-        if hasattr(self, 'order_part'):
+    def _add_order(self, ast):
+        order = getattr(self, 'order_part', None)
+        if getattr(self, '_keyset', False):
+            # break ties on node id so the cursor position is exact
+            name = last_x_in_ast(ast, 'name')['name']
+            if order is None:
+                order = {'order': 'id(' + name + ')', 'desc': False}
+            else:
+                order = dict(order, then='id(' + name + ')')
+        if order is not None and not last_x_in_ast(ast, 'return')['return'][0].startswith('count('):
             # find suitable place to insert order node
             for i, entry in enumerate(reversed(ast)):
                 if not ('limit' in entry or 'skip' in entry):
-                    ast.insert(len(ast) - i, self.order_part)
+                    ast.insert(len(ast) - i, order)
                     break
-        results, meta = self.start_node.cypher(Query(ast), self.query_params)
+
+    def _execution_params(self, ast):
+        # skip and limit are sent as parameters so every page shares one query
+        params = dict(self.query_params)
+        for entry in ast:
+            if 'skip' in entry:
+                params['skip'] = entry['skip']
+            elif 'limit' in entry:
+                params['limit'] = entry['limit']
+        if getattr(self, '_cursor', None) is not None:
+            params['cursor_value'], params['cursor_id'] = self._cursor
+        return params
+
+    def _source(self):
+        return "{0}.traverse({1})".format(self.start_node.__class__.__name__, '.'.join(self.path))
+
+    def execute(self, ast, ordered=True):
+        if ordered:
+            self._add_order(ast)
+        with metrics.source(self._source()):
+            results, meta = self.start_node.cypher(Query(ast), self._execution_params(ast))
         self.last_ast = ast
         return results
 
+    def execute_stream(self, ast):
+        self._add_order(ast)
+        self.last_ast = ast
+        rows = self.start_node.cypher_stream(Query(ast), self._execution_params(ast))
+        return _labelled(self._source(), rows)
+
     def execute_and_inflate_nodes(self, ast):
         target_map = last_x_in_ast(ast, 'target_map')['target_map']
         results = self.execute(ast)
-        nodes = [row[0] for row in results]
-        classes = [target_map[row[1].type] for row in results]
-        return [cls.inflate(node) for node, cls in zip(nodes, classes)]
+        with metrics.measure('inflate', _model_names(target_map)) as event:
+            event['rows'] = len(results)
+            nodes = [row[0] for row in results]
+            classes = [target_map[row[1].type] for row in results]
+            return [cls.inflate(node) for node, cls in zip(nodes, classes)]
 
 
 class TraversalSet(AstBuilder):
     """API level methods"""
     def __init__(self, start_node):
         super(TraversalSet, self).__init__(start_node)
+        self._result_cache = None
+        self._count_cache = None
+        self._prefetch = []
 
     def traverse(self, rel, *where_stmts):
         if self.start_node.__node__ is None:
             raise Exception("Cannot traverse unsaved node")
         self._traverse(rel, where_stmts)
-        return self
+        return self.invalidate()
 
     def order_by(self, prop):
         self._set_order(prop, desc=False)
-        return self
+        return self.invalidate()
 
     def order_by_desc(self, prop):
         self._set_order(prop, desc=True)
-        return self
+        return self.invalidate()
 
     def where(self, ident, op, value):
         expr = self._where_node(ident, op, value)
         self._add_where([expr])
-        return self
+        return self.invalidate()
 
     def skip(self, count):
         if int(count) < 0:
             raise ValueError("Negative skip value not supported")
         self._skip = int(count)
-        return self
+        return self.invalidate()
 
     def limit(self, count):
         if int(count) < 0:
             raise ValueError("Negative limit value not supported")
         self._limit = int(count)
-        return self
+        return self.invalidate()
+
+    def after(self, cursor, order_by=None):
+        """
+        Keyset pagination, only match nodes following cursor in the traversal
+        order, which is the order_by property then node id. Unlike skip the
+        server doesn't walk the preceding rows. A cursor of None starts at the
+        first node.
+        """
+        if order_by is not None:
+            self.order_by(order_by)
+        self._keyset = True
+        self._cursor = None if cursor is None else decode_cursor(cursor)
+        return self.invalidate()
+
+    def cursor(self, node):
+        """the cursor pointing after node, for use with after()"""
+        if hasattr(self, 'order_part'):
+            prop = self.order_part['order'].split('.')[1]
+            target_map = last_x_in_ast(self.ast, 'target_map')['target_map']
+            return encode_cursor(_deflate_node_value(target_map, prop, getattr(node, prop)),
+                                 node.__node__._id)
+        return encode_cursor(None, node.__node__._id)
+
+    def page(self, size, cursor=None):
+        """
+        The next size nodes after cursor and the cursor for the following
+        page, which is None once the last page is reached
+        """
+        nodes = self.after(cursor).limit(size).run()
+        if len(nodes) < size or not nodes:
+            return nodes, None
+        return nodes, self.cursor(nodes[-1])
+
+    def prefetch(self, *lookups):
+        """fetch the named relationships of all matched nodes upfront, see prefetch_related"""
+        self._prefetch.extend(lookups)
+        return self.invalidate()
+
+    def _fetch(self):
+        ast = list(self.ast)
+        self._add_return(ast)
+        return self._inflate_page(ast)
+
+    def _inflate_page(self, ast):
+        nodes = self.execute_and_inflate_nodes(ast)
+        if self._prefetch and nodes:
+            prefetch_related(nodes, *self._prefetch)
+        return nodes
 
     def run(self):
-        ast = deepcopy(self.ast)
+        if self._result_cache is None:
+            self._result_cache = self._fetch()
+        return list(self._result_cache)
+
+    def _first_row_ast(self):
+        ast = list(self.ast)
+        self._add_return(ast)
+        ast = [entry for entry in ast if 'limit' not in entry]
+        ast.append({'limit': 1})
+        return ast
+
+    def first(self):
+        """the first matched node or None, fetched with LIMIT 1"""
+        if self._result_cache is not None:
+            return self._result_cache[0] if self._result_cache else None
+        if getattr(self, '_limit', None) == 0:
+            return None
+        nodes = self._inflate_page(self._first_row_ast())
+        return nodes[0] if nodes else None
+
+    def exists(self):
+        """true if anything matches, checked with LIMIT 1 rather than a count"""
+        if self._result_cache is not None:
+            return bool(self._result_cache)
+        if self._count_cache is not None:
+            return self._count_cache > 0
+        if getattr(self, '_limit', None) == 0:
+            return False
+        ast = self._first_row_ast()
+        last_x_in_ast(ast, 'return')['return'] = ['id(' + last_x_in_ast(ast, 'name')['name'] + ')']
+        # without a skip the order doesn't matter, don't make the server sort
+        return bool(self.execute(ast, ordered=bool(getattr(self, '_skip', 0))))
+
+    def invalidate(self):
+        """drop cached results, the next evaluation queries the server again"""
+        self._result_cache = None
+        self._count_cache = None
+        return self
+
+    def stream(self):
+        """
+        inflate nodes one at a time as rows arrive from the server, the
+        response holds a pool slot until the stream is exhausted or closed
+        """
+        ast = list(self.ast)
         self._add_return(ast)
-        return self.execute_and_inflate_nodes(ast)
+        target_map = last_x_in_ast(ast, 'target_map')['target_map']
+        for row in self.execute_stream(ast):
+            yield target_map[row[1].type].inflate(row[0])
+
+    def delete(self):
+        """
+        delete all nodes matched by this traversal by id without inflating
+        them, in chunks of DELETE_BATCH_SIZE, see StructuredNode.delete_many.
+        No delete hooks run for the matched nodes
+        """
+        ast = list(self.ast)
+        self._add_return(ast)
+        name = last_x_in_ast(ast, 'name')['name']
+        target_map = last_x_in_ast(ast, 'target_map')['target_map']
+        last_x_in_ast(ast, 'return')['return'] = ['id({0})'.format(name), 'type(r{0})'.format(self.ident_count)]
+        # the order only matters when a skip or limit picks the nodes
+        ordered = hasattr(self, '_skip') or hasattr(self, '_limit')
+        by_class = {}
+        for node_id, rel_type in self.execute(ast, ordered=ordered):
+            by_class.setdefault(target_map[rel_type], []).append(node_id)
+        self.invalidate()
+        return sum(cls.delete_many(ids) for cls, ids in by_class.items())
+
+    def iterate(self, chunk_size=None):
+        """
+        Lazily inflate matched nodes. Without chunk_size rows are streamed and
+        inflated as they are consumed, see stream(). With chunk_size nodes are fetched in
+        pages of that many rows using SKIP and LIMIT, no response is held open
+        between pages; use order_by for a stable order across pages.
+        """
+        if not chunk_size:
+            # prefetching needs the whole result set
+            return iter(self._fetch()) if self._prefetch else self.stream()
+        if int(chunk_size) < 0:
+            raise ValueError("Negative chunk size not supported")
+        return self._iterate_chunks(int(chunk_size))
+
+    def _iterate_chunks(self, chunk_size):
+        skip = getattr(self, '_skip', 0)
+        remaining = getattr(self, '_limit', None)
+        while remaining is None or remaining > 0:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            ast = list(self.ast)
+            self._add_return(ast)
+            ast = [entry for entry in ast if not ('skip' in entry or 'limit' in entry)]
+            ast.extend([{'skip': skip}, {'limit': size}])
+            nodes = self._inflate_page(ast)
+            for node in nodes:
+                yield node
+            if len(nodes) < size:
+                break
+            skip += size
+            if remaining is not None:
+                remaining -= size
+
+    def _iterate_and_cache(self):
+        # rows are read in one request, not streamed, so no pool slot is
+        # held while the loop body runs queries of its own
+        ast = list(self.ast)
+        self._add_return(ast)
+        target_map = last_x_in_ast(ast, 'target_map')['target_map']
+        nodes = []
+        for node, rel in self.execute(ast):
+            nodes.append(target_map[rel.type].inflate(node))
+            yield nodes[-1]
+        # only a fully consumed iteration is cached
+        self._result_cache = nodes
 
     def __iter__(self):
-        return iter(self.run())
+        if self._result_cache is not None:
+            return iter(self._result_cache)
+        if self._prefetch:
+            return iter(self.run())
+        return self._iterate_and_cache()
+
+    def __getitem__(self, key):
+        if self._result_cache is None:
+            self._result_cache = self._fetch()
+        return self._result_cache[key]
 
     def __len__(self):
-        ast = deepcopy(self.ast)
-        self._add_return_count(ast)
-        return self.execute(ast)[0][0]
+        if self._result_cache is not None:
+            return len(self._result_cache)
+        if self._count_cache is None:
+            ast = list(self.ast)
+            self._add_return_count(ast)
+            self._count_cache = self.execute(ast)[0][0]
+        return self._count_cache
 
     def __bool__(self):
-        return bool(len(self))
+        self.run()
+        return bool(self._result_cache)
 
     def __nonzero__(self):
-        return bool(len(self))
+        return self.__bool__()
 
 
 class Query(object):
@@ -352,14 +700,23 @@ class Query(object):
         return "WHERE " + expr
 
     def _render_skip(self, entry):
-        return "SKIP {0}".format(entry['skip'])
+        return "SKIP {skip}"
 
     def _render_limit(self, entry):
-        return "LIMIT {0}".format(entry['limit'])
+        return "LIMIT {limit}"
 
     def _render_order(self, entry):
         sort = ' DESC' if entry['desc'] else ''
+        if entry.get('then'):
+            return "ORDER BY {0}{1}, {2}{1}".format(entry['order'], sort, entry['then'])
         return "ORDER BY {0}{1}".format(entry['order'], sort)
 
     def __str__(self):
-        return self._build()
+        shape = ast_shape(self.ast)
+        query = _render_cache.get(shape)
+        if query is None:
+            query = self._build()
+            if len(_render_cache) >= RENDER_CACHE_SIZE:
+                _render_cache.clear()
+            _render_cache[shape] = query
+        return query
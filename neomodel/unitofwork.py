@@ -0,0 +1,231 @@
+import threading
+import functools
+from contextlib import contextmanager
+from py2neo import neo4j
+from .util import CustomBatch, _cypher_rows
+from .exception import SessionFlushError
+from .identitymap import current_identity_map
+
+_local = threading.local()
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def current_session():
+    """The session active in this thread, if any"""
+    return getattr(_local, 'session', None)
+
+
+@contextmanager
+def session(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Record saves, deletes, connects and disconnects made in the block and
+    send them in as few batch requests as possible when it exits::
+
+        with neomodel.session():
+            jim = Person(name='Jim').save()
+            jim.is_from.connect(germany)
+
+    Nothing is sent if the block raises. post_create, post_save and
+    post_delete hooks run, and deleted instances are marked deleted, once the
+    batch holding the operation has been sent. Nested sessions join the
+    outer one.
+    """
+    current = current_session()
+    if current is not None:
+        yield current
+        return
+
+    s = Session(batch_size)
+    _local.session = s
+    try:
+        yield s
+    finally:
+        _local.session = None
+    s.flush()
+
+
+class _Operation(object):
+    """A write recorded by a session, label describes it in SessionFlushError"""
+    def __init__(self, label, write, index_name=None, node_id='(unsaved)', model=None,
+                 callback=None, needs=()):
+        self.label = label
+        # write(batch) appends the requests, callback(responses) receives their responses
+        self.write = write
+        self.callback = callback
+        self.index_name = index_name
+        self.node_id = node_id
+        self.model = model
+        # nodes whose ids the requests need, they must have been created already
+        self.needs = needs
+        # called once the operation has been sent
+        self.after = []
+
+
+class Session(object):
+    """
+    Unit of work, see session(). Operations are sent in the order they were
+    recorded, each submission holds at most batch_size requests. A batch is
+    submitted early when an operation needs the id of a node created in it.
+    """
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._operations = []
+        self._pending = {}
+        self._deleted = {}
+        self._changes = {}
+
+    def is_pending(self, node):
+        """True if node will be created when the session is flushed"""
+        return id(node) in self._pending
+
+    def is_deleted(self, node):
+        """True if node will be deleted when the session is flushed"""
+        return id(node) in self._deleted
+
+    def mark_deleted(self, node):
+        self._deleted[id(node)] = node
+
+    def pending_changes(self, manager):
+        """
+        Nodes connected and nodes disconnected through the given relationship
+        manager in this session, going by the last action on each node
+        """
+        changes = self._changes.get((id(manager.origin), manager.name), {})
+        connected = [obj for obj, is_connect in changes.values() if is_connect]
+        disconnected = [obj for obj, is_connect in changes.values() if not is_connect]
+        return connected, disconnected
+
+    def _change(self, manager, obj, is_connect):
+        changes = self._changes.setdefault((id(manager.origin), manager.name), {})
+        changes[id(obj)] = (obj, is_connect)
+
+    def save(self, node, after=None):
+        cls = node.__class__
+        if node.__node__ is None:
+            op = self._pending.get(id(node))
+            if op is None:
+                op = self._record(('create', node), None, index_name=cls.index.name, model=cls.__name__)
+                op.write = functools.partial(self._create, op)
+                op.callback = functools.partial(self._created, node)
+                if hasattr(node, 'post_create'):
+                    op.after.append(node.post_create)
+                self._pending[id(node)] = op
+            op.props = node.deflate(node.__properties__)
+        else:
+            # capture the node and properties now, a later delete clears __node__
+            db_node = node.__node__
+            props = node.deflate(node.__properties__, db_node._id)
+            op = self._record(('save', node),
+                              functools.partial(node._batch_update, db_node=db_node, props=props),
+                              index_name=cls.index.name, node_id=db_node._id, model=cls.__name__)
+        if after is not None:
+            op.after.append(after)
+
+    def _create(self, op, batch):
+        cls = op.label[1].__class__
+        category = cls.category()
+        props = op.props
+        ref = len(batch._requests)
+        batch.create(neo4j.Node.abstract(**props))
+        batch.create(neo4j.Relationship.abstract(category.__node__,
+                                                 cls.relationship_type(), ref, __instance__=True))
+        cls._update_indexes(ref, props, batch)
+
+    def _created(self, node, responses):
+        node.__node__ = responses[0].hydrated
+        imap = current_identity_map()
+        if imap is not None:
+            imap.add(node)
+
+    def delete(self, node, after=None):
+        from .core import DELETE_QUERY
+        db_node = node.__node__
+        self.mark_deleted(node)
+
+        def delete(batch):
+            batch.remove_from_index(neo4j.Node, index=node.index.__index__, entity=db_node)
+            batch.append_cypher(DELETE_QUERY, {'self': db_node._id})
+        op = self._record(('delete', node), delete, index_name=node.__class__.index.name,
+                          node_id=db_node._id, model=node.__class__.__name__)
+        if after is not None:
+            op.after.append(after)
+
+    def connect(self, manager, obj, properties=None):
+        q, params, rel_instance = manager._connect_query(obj, properties)
+        self._change(manager, obj, True)
+
+        def connect(batch):
+            params.update({'self': manager.origin.__node__._id, 'them': obj.__node__._id})
+            batch.append_cypher(q, params)
+
+        def connected(responses):
+            rel_instance.__relationship__ = _cypher_rows(responses[0])[0][0]
+        self._record(('connect', manager.origin, manager.name, obj), connect,
+                     model=manager.origin.__class__.__name__,
+                     callback=connected if rel_instance is not None else None,
+                     needs=(manager.origin, obj))
+        return rel_instance
+
+    def disconnect(self, manager, obj):
+        q = manager._disconnect_query()
+        self._change(manager, obj, False)
+
+        def disconnect(batch):
+            batch.append_cypher(q, {'self': manager.origin.__node__._id, 'them': obj.__node__._id})
+        self._record(('disconnect', manager.origin, manager.name, obj), disconnect,
+                     model=manager.origin.__class__.__name__, needs=(manager.origin, obj))
+
+    def _record(self, label, write, **kwargs):
+        op = _Operation(label, write, **kwargs)
+        self._operations.append(op)
+        return op
+
+    def _new_batch(self):
+        from .core import connection
+        return CustomBatch(connection(), None)
+
+    def flush(self):
+        """
+        Send all recorded operations. If a batch fails after earlier ones were
+        committed SessionFlushError is raised listing the committed operations,
+        their hooks have run.
+        """
+        operations, self._operations = self._operations, []
+        self._pending = {}
+        self._deleted = {}
+        self._changes = {}
+
+        committed = []
+        batch, submitted, created = self._new_batch(), [], set()
+        try:
+            for op in operations:
+                if submitted and any(id(node) in created for node in op.needs):
+                    self._submit(batch, submitted, committed)
+                    batch, submitted, created = self._new_batch(), [], set()
+                start = len(batch._requests)
+                batch.mark(op.index_name, op.node_id)
+                batch.model = op.model if not submitted or batch.model == op.model else None
+                op.write(batch)
+                submitted.append((op, start, len(batch._requests)))
+                if op.label[0] == 'create':
+                    created.add(id(op.label[1]))
+                if len(batch._requests) >= self.batch_size:
+                    self._submit(batch, submitted, committed)
+                    batch, submitted, created = self._new_batch(), [], set()
+            if submitted:
+                self._submit(batch, submitted, committed)
+        except Exception as e:
+            if not committed:
+                raise
+            raise SessionFlushError(e, [op.label for op in committed])
+
+    def _submit(self, batch, submitted, committed):
+        responses = batch.submit_responses()
+        for op, start, end in submitted:
+            if op.callback is not None:
+                op.callback(responses[start:end])
+            committed.append(op)
+        for op, start, end in submitted:
+            for fn in op.after:
+                fn()
@@ -1,30 +1,58 @@
 import re
 from py2neo import neo4j
 from .exception import UniqueProperty, DataInconsistencyError
+from . import metrics
 
 camel_to_upper = lambda x: "_".join(word.upper() for word in re.split(r"([A-Z][0-9a-z]*)", x)[1::2])
 upper_to_camel = lambda x: "".join(word.title() for word in x.split("_"))
 
 # the default value "true;format=pretty" causes the server to loose individual status codes in batch responses
-neo4j._headers[None] = [("X-Stream", "true")]
+# keep-alive asks the server to leave sockets open for httpstream to reuse
+neo4j._headers[None] = [("X-Stream", "true"), ("Connection", "keep-alive")]
 
 
 class CustomBatch(neo4j.WriteBatch):
-    def __init__(self, graph, index_name, node='(unsaved)'):
+    def __init__(self, graph, index_name, node='(unsaved)', model=None):
         super(CustomBatch, self).__init__(graph)
         self.index_name = index_name
         self.node = node
+        # node class name the batch is reported under in metrics
+        self.model = model
+        self._marks = []
+
+    def mark(self, index_name, node='(unsaved)'):
+        """label the requests appended from now on in conflict errors"""
+        self._marks.append((len(self._requests), index_name, node))
+
+    def _label(self, i):
+        index_name, node = self.index_name, self.node
+        for start, mark_index, mark_node in self._marks:
+            if start > i:
+                break
+            index_name, node = mark_index, mark_node
+        return index_name, node
 
     def submit(self):
-        responses = self._execute()
-        batch_responses = [neo4j.BatchResponse(r) for r in responses.json]
+        return [r.hydrated for r in self.submit_responses()]
+
+    def submit_responses(self):
+        from .core import _request
+        with _request('batch', self.model) as event:
+            event['rows'] = len(self._requests)
+            responses = self._execute()
+            content = responses.json
+            if metrics.active():
+                event['request_bytes'] = metrics.payload_size(
+                    [{'method': r.method, 'to': str(r.uri), 'body': r.body} for r in self._requests])
+                event['response_bytes'] = metrics.payload_size(content)
+        batch_responses = [neo4j.BatchResponse(r) for r in content]
         if self._graph_db.neo4j_version < (1, 9):
             self._legacy_check_for_conflicts(responses, batch_responses, self._requests)
         else:
             self._check_for_conflicts(responses, batch_responses, self._requests)
 
         try:
-            return [r.hydrated for r in batch_responses]
+            return batch_responses
         finally:
             responses.close()
 
@@ -33,16 +61,25 @@ class CustomBatch(neo4j.WriteBatch):
             if r.status_code == 409:
                 responses.close()
                 raise UniqueProperty(
-                        requests[i].body['key'], requests[i].body['key'],
-                        self.index_name, self.node)
+                        requests[i].body['key'], requests[i].body.get('value'), *self._label(i))
 
     def _legacy_check_for_conflicts(self, responses, batch_responses, requests):
         for i, r in enumerate(batch_responses):
-            if r.status_code == 200:
+            # only additions to an index are relevant, other requests also return 200
+            if r.status_code == 200 and _is_index_addition(requests[i]):
                 responses.close()
                 raise DataInconsistencyError(
-                        requests[i].body['key'], requests[i].body['key'],
-                        self.index_name, self.node)
+                        requests[i].body['key'], requests[i].body.get('value'), *self._label(i))
+
+
+def _is_index_addition(request):
+    """true for a batch request adding an entity to an index, a POST to its uri"""
+    return request.method == 'POST' and 'index/' in str(request.uri)
+
+
+def _cypher_rows(response):
+    """rows of a cypher query submitted as part of a batch"""
+    return [[neo4j._hydrated(value) for value in row] for row in response.body['data']]
 
 
 def _legacy_conflict_check(cls, node, props):
@@ -51,8 +88,12 @@ def _legacy_conflict_check(cls, node, props):
     exists in the index before executing the batch.
     """
     for key, value in props.items():
-        if key in cls._class_properties() and cls.get_property(key).unique_index:
-            results = cls.index.__index__.get(key, value)
+        if key in cls.__schema__.unique_indexed:
+            from .core import _request
+            index = cls.index.__index__
+            with _request('index', cls.__name__) as event:
+                results = index.get(key, value)
+                event['rows'] = len(results)
             if len(results):
                 if isinstance(node, (int,)):  # node ref
                     raise UniqueProperty(key, value, cls.index.name)
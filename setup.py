@@ -1,5 +1,11 @@
+import sys
 from setuptools import setup, find_packages
 
+install_requires = ['py2neo==1.6.1', 'pytz==2013.8', 'lucene-querybuilder==0.2']
+if sys.version_info < (3, 2):
+    # concurrent.futures backport
+    install_requires.append('futures')
+
 setup(
     name='neomodel',
     version='0.4.0',
@@ -14,7 +20,7 @@ setup(
     keywords='graph neo4j py2neo ORM',
     tests_require=['nose==1.1.2'],
     test_suite='nose.collector',
-    install_requires=['py2neo==1.6.1', 'pytz==2013.8', 'lucene-querybuilder==0.2'],
+    install_requires=install_requires,
     classifiers=[
         "Development Status :: 5 - Production/Stable",
         'Intended Audience :: Developers',
@@ -0,0 +1,107 @@
+import time
+import threading
+from neomodel import StructuredNode, StringProperty, RelationshipTo, aio, core, connection, pool_stats
+
+
+class AioPerson(StructuredNode):
+    name = StringProperty(unique_index=True)
+    friends = RelationshipTo('AioPerson', 'FRIEND')
+
+
+def run_in_loop(*calls):
+    """ start the calls once the loop is running, as a coroutine would, and gather their results """
+    import asyncio
+    loop = asyncio.new_event_loop()
+    done = loop.create_future()
+
+    def finished(gathered):
+        if gathered.exception() is not None:
+            done.set_exception(gathered.exception())
+        else:
+            done.set_result(gathered.result())
+
+    loop.call_soon(lambda: asyncio.gather(*[call() for call in calls]).add_done_callback(finished))
+    try:
+        return loop.run_until_complete(done)
+    finally:
+        loop.close()
+
+
+def test_run_off_the_loop():
+    if not aio.AIO_SUPPORT:
+        return
+    loop_thread = threading.current_thread()
+    result, thread = run_in_loop(lambda: aio.run(lambda x: x * 2, 21),
+                                 lambda: aio.run(threading.current_thread))
+    assert result == 42
+    assert thread is not loop_thread
+
+
+def test_max_workers():
+    if not aio.AIO_SUPPORT:
+        return
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def call():
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    aio.configure(max_workers=2)
+    try:
+        run_in_loop(*[lambda: aio.run(call) for _ in range(6)])
+    finally:
+        aio.configure()
+    assert running[1] <= 2
+
+
+def test_workers_release_connections():
+    if not aio.AIO_SUPPORT:
+        return
+
+    def call():
+        connection()
+        time.sleep(0.02)
+
+    limits = core.POOL_SIZE, core.POOL_MAX_IN_FLIGHT, core.POOL_TIMEOUT
+    # more workers than connections, a worker keeping its connection would starve the others
+    core.configure_pool(size=1, timeout=1)
+    aio.configure(max_workers=2)
+    try:
+        run_in_loop(*[lambda: aio.run(call) for _ in range(4)])
+        assert pool_stats()['checked_out'] == 0
+        assert connection()
+    finally:
+        aio.configure()
+        core.configure_pool(*limits)
+
+
+def test_defer_proxies_attributes():
+    if not aio.AIO_SUPPORT:
+        return
+
+    class Manager(object):
+        def all(self, n):
+            return list(range(n))
+
+    class Node(object):
+        friends = Manager()
+
+    assert run_in_loop(lambda: aio.defer(Node()).friends.all(3)) == [[0, 1, 2]]
+
+
+def test_deferred_calls():
+    if not aio.AIO_SUPPORT:
+        return
+    jim = AioPerson(name='AioJim').save()
+    jim.friends.connect(AioPerson(name='AioBob').save())
+    bob, friends, (results, meta) = run_in_loop(
+        lambda: aio.defer(AioPerson.index).get(name='AioBob'),
+        lambda: aio.defer(jim).friends.all(),
+        lambda: aio.cypher_query("START a=node({self}) RETURN a.name", {'self': jim.__node__._id}))
+    assert friends[0] == bob
+    assert results[0][0] == 'AioJim'
@@ -128,3 +128,36 @@ def test_cardinality_one():
         assert True
     else:
         assert False
+
+
+def test_cardinality_connect_many():
+    m = Monkey(name='sally').save()
+    s1 = ScrewDriver(version=3).save()
+    s2 = ScrewDriver(version=4).save()
+
+    try:
+        m.driver.connect_many([s1, s2])
+    except AttemptedCardinalityViolation:
+        assert True
+    else:
+        assert False
+
+    # a property list must match the nodes
+    try:
+        m.driver.connect_many([s1], [])
+    except ValueError:
+        assert True
+    else:
+        assert False
+
+    m.driver.connect_many([s1])
+    assert m.driver.single().version == 3
+
+    # refused by the server as a relationship already exists
+    try:
+        m.driver.connect_many([s2])
+    except AttemptedCardinalityViolation:
+        assert True
+    else:
+        assert False
+    assert len(m.driver.all()) == 1
@@ -1,4 +1,4 @@
-from neomodel import StructuredNode, StringProperty
+from neomodel import StructuredNode, StringProperty, clear_category_cache
 
 
 class Giraffe(StructuredNode):
@@ -41,3 +41,11 @@ def test_category_node():
 # doesn't bork if no category node
 def test_no_category_node():
     assert len(Foobar.category().instance.all()) == 0
+
+
+def test_category_node_cached():
+    category = Giraffe.category()
+    assert Giraffe.category() is category
+    clear_category_cache()
+    assert Giraffe.category() is not category
+    assert Giraffe.category().__node__ == category.__node__
@@ -0,0 +1,66 @@
+import time
+import functools
+import threading
+from neomodel import StructuredNode, StringProperty, RelationshipTo, gather, concurrency
+
+
+class Gatherer(StructuredNode):
+    name = StringProperty(unique_index=True)
+    friends = RelationshipTo('Gatherer', 'FRIEND')
+
+
+def test_gather():
+    jim = Gatherer(name='GatherJim').save()
+    jim.friends.connect(Gatherer(name='GatherBob').save())
+
+    friends, bob, (rows, columns) = gather(
+        jim.traverse('friends'),
+        functools.partial(Gatherer.index.get, name='GatherBob'),
+        ("START a=node({id}) RETURN a.name", {'id': jim.__node__._id}))
+    assert friends == [bob]
+    assert rows[0][0] == 'GatherJim'
+
+
+def test_gather_errors():
+    def fail():
+        raise ValueError("failed")
+
+    results = gather(fail, "START a=node({self}) RETURN xx", lambda: 1, return_exceptions=True)
+    assert isinstance(results[0], ValueError)
+    assert isinstance(results[1], Exception)
+    assert results[2] == 1
+
+    try:
+        gather(lambda: 1, fail, max_workers=1)
+    except ValueError:
+        assert True
+    else:
+        assert False
+
+
+def test_gather_shared_executor():
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def call():
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return threading.current_thread()
+
+    concurrency.configure(max_workers=2)
+    try:
+        threads = set(gather(*[call for _ in range(6)]))
+        threads.update(gather(*[call for _ in range(6)]))
+        workers = set(concurrency.get_executor()._threads)
+        # nested calls don't wait on busy workers
+        assert gather(lambda: gather(lambda: 1, lambda: 2), lambda: 3) == [[1, 2], 3]
+    finally:
+        concurrency.configure()
+    assert running[1] <= 2
+    # calls run on the calling thread and the shared executor's threads
+    assert threading.current_thread() in threads
+    assert threads - set([threading.current_thread()]) <= workers
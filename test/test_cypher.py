@@ -1,4 +1,4 @@
-from neomodel import StructuredNode, StringProperty, CypherException
+from neomodel import StructuredNode, StringProperty, CypherException, cypher_stream
 
 
 class User2(StructuredNode):
@@ -32,3 +32,18 @@ def test_cypher_syntax_error():
         assert hasattr(e, 'java_exception')
     else:
         assert False
+
+
+def test_cypher_stream():
+    jim = User2(email='jim2@test.com').save()
+    rows = jim.cypher_stream("START a=node({self}) RETURN a.email, 3")
+    assert next(rows) == ['jim2@test.com', 3]
+    assert not list(rows)
+
+    rows = cypher_stream("START a=node({self}) RETURN xx", {'self': jim.__node__._id})
+    try:
+        next(rows)
+    except CypherException:
+        assert True
+    else:
+        assert False
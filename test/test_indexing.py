@@ -1,4 +1,5 @@
-from neomodel import StructuredNode, StringProperty, IntegerProperty, UniqueProperty
+from neomodel import (StructuredNode, StringProperty, IntegerProperty, UniqueProperty,
+        warm_indexes, invalidate_indexes)
 from lucenequerybuilder import Q
 
 
@@ -106,3 +107,14 @@ def test_custom_index_name():
 
     # custom indexes shall be inherited
     assert SpecialGiraffe.index.name == 'GiraffeIndex'
+
+
+def test_index_handle_cached():
+    warm_indexes()
+    index = Human.index.__index__
+    assert Human.index.__index__ is index
+    Human.index.invalidate()
+    assert Human.index._index is None
+    assert Human.index.__index__.name == index.name
+    invalidate_indexes()
+    assert Human.index._index is None
@@ -0,0 +1,91 @@
+import time
+import threading
+from neomodel import StructuredNode, StringProperty, metrics
+
+
+class Metered(StructuredNode):
+    name = StringProperty(unique_index=True)
+
+
+def test_events_and_snapshot():
+    # resolve the index and category node up front
+    Metered(name='warm').save()
+    events = []
+    metrics.add_listener(events.append)
+    metrics.enable()
+    metrics.reset()
+    try:
+        m = Metered(name='metered').save()
+        Metered.index.search(name='metered')
+        m.cypher("START a=node({self}) RETURN a")
+    finally:
+        metrics.remove_listener(events.append)
+        metrics.enable(False)
+
+    kinds = [e['kind'] for e in events]
+    assert 'batch' in kinds and 'index' in kinds and 'cypher' in kinds
+    cypher = [e for e in events if e['kind'] == 'cypher'][0]
+    assert cypher['model'] == 'Metered' and cypher['rows'] == 1
+    assert cypher['duration'] > 0 and cypher['request_bytes'] > 0 and cypher['response_bytes'] > 0
+    assert cypher['wait'] >= 0
+    batch = [e for e in events if e['kind'] == 'batch'][0]
+    assert batch['request_bytes'] > 0 and batch['response_bytes'] > 0
+    index = [e for e in events if e['kind'] == 'index'][0]
+    assert index['request_bytes'] > 0 and index['response_bytes'] > 0
+
+    stats = dict(((s['kind'], s['model']), s) for s in metrics.snapshot())
+    assert stats[('batch', 'Metered')]['count'] == 1
+    assert stats[('index', 'Metered')]['count'] == 1
+    assert sum(stats[('cypher', 'Metered')]['histogram']) == 1
+    assert stats[('cypher', 'Metered')]['response_bytes'] == cypher['response_bytes']
+
+
+def test_entity_requests():
+    m = Metered(name='refreshed').save()
+    events = []
+    metrics.add_listener(events.append)
+    try:
+        m.refresh()
+        m.delete()
+    finally:
+        metrics.remove_listener(events.append)
+    assert [e['kind'] for e in events] == ['node', 'node', 'index', 'cypher']
+
+
+def test_wait_not_in_duration():
+    from neomodel import core
+    events = []
+    metrics.add_listener(events.append)
+    limits = core.POOL_SIZE, core.POOL_MAX_IN_FLIGHT, core.POOL_TIMEOUT
+    core.configure_pool(max_in_flight=1)
+    pool = core.get_pool()
+    try:
+        with pool.request():
+            t = threading.Thread(target=lambda: core.cypher_query("START a=node(0) RETURN a"))
+            t.start()
+            # hold the only slot while the query queues for it
+            while not pool.stats()['queued']:
+                time.sleep(0.001)
+            time.sleep(0.05)
+        t.join()
+    finally:
+        metrics.remove_listener(events.append)
+        core.configure_pool(*limits)
+    cypher = [e for e in events if e['kind'] == 'cypher'][0]
+    assert cypher['wait'] >= 0.05
+    assert cypher['duration'] < cypher['wait']
+
+
+def test_stream_excludes_idle_time():
+    m = Metered(name='streamed').save()
+    events = []
+    metrics.add_listener(events.append)
+    try:
+        for row in m.cypher_stream("START a=node({self}) RETURN a"):
+            time.sleep(0.05)
+    finally:
+        metrics.remove_listener(events.append)
+    cypher = events[-1]
+    assert cypher['rows'] == 1
+    assert cypher['idle'] >= 0.05
+    assert cypher['duration'] < cypher['idle']
@@ -1,4 +1,4 @@
-from neomodel import (StructuredNode, StringProperty, IntegerProperty)
+from neomodel import (StructuredNode, StringProperty, IntegerProperty, identity_map)
 from neomodel.exception import RequiredProperty, UniqueProperty
 
 
@@ -123,3 +123,72 @@ def test_refresh():
     c.refresh()
     assert c.age == 20
     assert c.my_custom_prop == 'value'
+
+
+class Customer3(StructuredNode):
+    email = StringProperty(unique_index=True, required=True)
+    deleted = []
+
+    def post_delete(self):
+        Customer3.deleted.append(self.email)
+
+
+def test_delete_many():
+    customers = [Customer3(email='many{0}@email.com'.format(i)).save() for i in range(5)]
+    node_id = customers[4].__node__._id
+    assert Customer3.delete_many(customers[:4] + [node_id], batch_size=2) == 5
+    assert len(Customer3.deleted) == 4
+    assert customers[0]._is_deleted
+    assert not Customer3.index.search(email='many4@email.com')
+    assert not Customer3.category().instance.all()
+
+
+def test_traversal_delete():
+    for i in range(3):
+        Customer3(email='traversal{0}@email.com'.format(i)).save()
+    hooked = len(Customer3.deleted)
+    assert Customer3.category().traverse('instance').delete() == 3
+    # deleted by id, nothing is inflated
+    assert len(Customer3.deleted) == hooked
+    assert not Customer3.category().instance.all()
+
+
+def test_save_many():
+    customers = [Customer2(email='save{0}@email.com'.format(i), age=i).save() for i in range(4)]
+    for c in customers:
+        c.age += 10
+    Customer2.save_many(customers, batch_size=3)
+    assert Customer2.index.get(email='save3@email.com').age == 13
+
+    customers[1].email = 'save0@email.com'
+    try:
+        Customer2.save_many(customers)
+    except UniqueProperty as e:
+        assert e.node == customers[1].__node__._id
+    else:
+        assert False
+
+
+def test_identity_map():
+    User(email='imap@email.com').save()
+    assert User.index.get(email='imap@email.com') is not User.index.get(email='imap@email.com')
+
+    with identity_map():
+        u = User.index.get(email='imap@email.com')
+        assert User.index.get(email='imap@email.com') is u
+        u2 = User(email='imap2@email.com').save()
+        assert User.index.get(email='imap2@email.com') is u2
+
+    # saved nodes hash by node id
+    assert len(set([u, User.index.get(email='imap@email.com')])) == 1
+
+    # unsaved nodes only equal themselves and are unhashable
+    unsaved = User(email='unsaved@email.com')
+    assert unsaved == unsaved
+    assert unsaved != User(email='unsaved@email.com')
+    try:
+        hash(unsaved)
+    except TypeError:
+        assert True
+    else:
+        assert False
@@ -0,0 +1,88 @@
+import threading
+from neomodel.pool import ConnectionPool, PoolTimeout
+from neomodel import connection, pool_stats
+
+
+def test_connection_per_thread():
+    pool = ConnectionPool('http://localhost/', factory=lambda url: object())
+    db = pool.checkout()
+    assert pool.checkout() is db
+
+    other = []
+    t = threading.Thread(target=lambda: other.append(pool.checkout()))
+    t.start()
+    t.join()
+    assert other[0] is not db
+
+    pool.release()
+    assert pool.stats()['checked_out'] <= 1
+    assert pool.stats()['created'] == 2
+
+
+def test_bounded_pool():
+    pool = ConnectionPool('http://localhost/', size=1, timeout=0.1, factory=lambda url: object())
+    db = pool.checkout()
+
+    errors = []
+
+    def checkout():
+        try:
+            pool.checkout()
+        except PoolTimeout as e:
+            errors.append(e)
+
+    t = threading.Thread(target=checkout)
+    t.start()
+    t.join()
+    assert errors
+
+    # released connections are reused
+    pool.release()
+    assert pool.checkout() is db
+
+
+def test_in_flight_stats():
+    pool = ConnectionPool('http://localhost/', max_in_flight=2, factory=lambda url: object())
+    with pool.request():
+        assert pool.stats()['in_flight'] == 1
+    assert pool.stats()['in_flight'] == 0
+    assert pool.stats()['requests'] == 1
+
+
+def test_in_flight_timeout():
+    pool = ConnectionPool('http://localhost/', max_in_flight=1, timeout=0.1, factory=lambda url: object())
+    errors = []
+
+    def request():
+        try:
+            with pool.request():
+                pass
+        except PoolTimeout as e:
+            errors.append(e)
+
+    with pool.request():
+        t = threading.Thread(target=request)
+        t.start()
+        t.join()
+    assert errors
+    assert pool.stats()['queued'] == 0
+
+    # the slot is free again
+    with pool.request():
+        assert pool.stats()['in_flight'] == 1
+
+
+def test_fork_resets_http_connections():
+    from neomodel import core
+    from py2neo.packages.httpstream import http
+    connection()
+    pool = core.get_pool()
+    # pretend the pool was created by a parent process
+    pool.pid = -1
+    assert core.get_pool() is not pool
+    assert not getattr(http.ConnectionPool, '_puddles', None)
+
+
+def test_default_pool():
+    assert connection() is connection()
+    assert pool_stats()['created'] >= 1
@@ -0,0 +1,50 @@
+import warnings
+from neomodel import (StructuredNode, StringProperty, RelationshipTo,
+        count_queries, assert_max_queries, detect_n_plus_one, NPlusOneWarning)
+
+
+class Counted(StructuredNode):
+    name = StringProperty(unique_index=True)
+    friends = RelationshipTo('Counted', 'FRIEND')
+
+
+def test_count_queries():
+    c = Counted(name='Count').save()
+    with count_queries() as counter:
+        c.friends.all()
+        Counted.index.search(name='Count')
+    assert counter.count == 2
+    assert [e['kind'] for e in counter.events] == ['cypher', 'index']
+
+
+def test_count_delete():
+    c = Counted(name='Deleted').save()
+    with count_queries() as counter:
+        c.delete()
+    # index entries are removed before the node
+    assert counter.count == 2
+
+
+def test_assert_max_queries():
+    c = Counted(name='Budget').save()
+    with assert_max_queries(1):
+        c.friends.all()
+    try:
+        with assert_max_queries(1):
+            c.friends.all()
+            c.friends.all()
+    except AssertionError as e:
+        assert 'Counted.traverse(friends)' in str(e)
+    else:
+        assert False
+
+
+def test_detect_n_plus_one():
+    nodes = [Counted(name='N{0}'.format(i)).save() for i in range(3)]
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        with detect_n_plus_one(threshold=3) as detector:
+            for node in nodes:
+                node.friends.all()
+    assert len(detector.reported) == 1
+    assert any(issubclass(w.category, NPlusOneWarning) for w in caught)
@@ -1,5 +1,5 @@
 from neomodel.properties import (IntegerProperty, DateTimeProperty,
-    DateProperty, StringProperty, JSONProperty)
+    DateProperty, StringProperty, JSONProperty, AliasProperty)
 from neomodel.exception import InflateError, DeflateError
 from neomodel import StructuredNode
 from pytz import timezone
@@ -157,3 +157,50 @@ def test_default_valude_callable_type():
     assert x.uid == '123'
     x.refresh()
     assert x.uid == '123'
+
+
+def test_class_schema():
+    class SchemaTestBase(StructuredNode):
+        uid = StringProperty(unique_index=True)
+        name = StringProperty(index=True, default='x')
+
+    class SchemaTestNode(SchemaTestBase):
+        age = IntegerProperty(required=True)
+        alias = AliasProperty(to='name')
+
+    schema = SchemaTestNode.__schema__
+    assert set(k for k, _ in schema.properties) == set(['uid', 'name', 'age'])
+    # inherited properties come first
+    assert schema.properties[-1][0] == 'age'
+    assert [k for k, _ in schema.aliases] == ['alias']
+    assert [k for k, _ in schema.defaults] == ['name']
+    assert schema.unique_indexed == frozenset(['uid'])
+    assert schema.indexed == frozenset(['name'])
+    assert schema.required == frozenset(['age'])
+    assert 'alias' in schema.names
+    # base class schema is unaffected by subclass
+    assert len(SchemaTestBase.__schema__.properties) == 2
+
+
+def test_generated_inflate_deflate():
+    class CodecTestNode(StructuredNode):
+        age = IntegerProperty(index=True)
+        name = StringProperty(default='jim')
+
+        def __init__(self, *args, **kwargs):
+            self.init_called = True
+            super(CodecTestNode, self).__init__(*args, **kwargs)
+
+    try:
+        CodecTestNode.deflate({'age': 'six'})
+    except DeflateError as e:
+        assert str(e).index('deflate property')
+    else:
+        assert False
+
+    CodecTestNode(age=31).save()
+    node = CodecTestNode.index.get(age=31)
+    assert node.age == 31
+    assert node.name == 'jim'
+    # custom __init__ is still respected when inflating
+    assert node.init_called
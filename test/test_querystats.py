@@ -0,0 +1,35 @@
+import json
+from neomodel import StructuredNode, StringProperty, RelationshipTo, cypher_query, querystats
+
+
+class Tallied(StructuredNode):
+    name = StringProperty(unique_index=True)
+    friends = RelationshipTo('Tallied', 'FRIEND')
+
+
+def test_fingerprint():
+    assert querystats.fingerprint("START a=node(12) WHERE a.name = 'x'\n RETURN a") == \
+        querystats.fingerprint("START a=node(3)  WHERE a.name = \"y\" RETURN a")
+    assert querystats.fingerprint("MATCH (a)-[r1:FRIEND]->(b)") == "MATCH (a)-[r1:FRIEND]->(b)"
+
+
+def test_query_stats():
+    querystats.reset()
+    querystats.enable()
+    querystats.enable()
+    try:
+        a = Tallied(name='TallyA').save()
+        b = Tallied(name='TallyB').save()
+        for node in (a, b):
+            node.friends.is_connected(a)
+        cypher_query("START a=node({0}) RETURN a".format(a.__node__._id))
+        cypher_query("START a=node({0}) RETURN a".format(b.__node__._id))
+    finally:
+        querystats.disable()
+
+    stats = dict((s['fingerprint'], s) for s in querystats.snapshot())
+    by_id = stats["START a=node(?) RETURN a"]
+    assert by_id['calls'] == 2 and by_id['rows'] == 2
+    assert by_id['p99_time'] <= by_id['max_time']
+    assert [s for fp, s in stats.items() if 'count(r)' in fp][0]['calls'] == 2
+    assert json.loads(querystats.dumps())
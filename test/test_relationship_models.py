@@ -98,3 +98,21 @@ def test_traversal_where_clause():
     assert rel2.since > now
     friends = tim.traverse('friend', ('since', '>', now)).run()
     assert len(friends) == 1
+
+
+def test_connect_many_with_rel_model():
+    ian = Badger(name="Ian").save()
+    stoats = [Stoat(name="Stoat{0}".format(i)).save() for i in range(3)]
+
+    rels = ian.hates.connect_many(stoats, [{'reason': 'a'}, {'reason': 'b'}, None])
+    assert len(rels) == 3
+    assert all(isinstance(rel, HatesRel) for rel in rels)
+    assert rels[0].reason == 'a'
+    assert rels[1].reason == 'b'
+    assert rels[2].end_node().name == 'Stoat2'
+    assert len(ian.hates.all()) == 3
+
+    # one request per batch_size nodes
+    more = [Stoat(name="Stoat{0}".format(i)).save() for i in range(3, 6)]
+    rels = ian.hates.connect_many(more, batch_size=2)
+    assert [rel.end_node().name for rel in rels] == ['Stoat3', 'Stoat4', 'Stoat5']
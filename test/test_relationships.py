@@ -1,5 +1,6 @@
 from neomodel import (StructuredNode, RelationshipTo, RelationshipFrom,
         Relationship, StringProperty, IntegerProperty, One)
+from neomodel.traversal import Query
 
 
 class Person(StructuredNode):
@@ -165,3 +166,31 @@ def test_props_relationship():
     result, meta = u.cypher('START root=node:Person(name={name})' +
         ' MATCH root-[r:IS_FROM]->() RETURN r.city', {'name': u.name})
     assert result and result[0][0] == 'Thessaloniki'
+
+
+def test_lazy_relationship_managers():
+    u = Person(name='Lazy', age=9)
+    assert 'is_from' not in u.__dict__
+    manager = u.is_from
+    assert manager.name == 'is_from'
+    assert u.is_from is manager
+    assert Person.is_from.target_map == {'COUNTRY': Country}
+    assert 'is_from' not in u.__properties__
+
+
+def test_exists_and_first():
+    u = Person(name='Exists', age=30).save()
+    assert not u.is_from.exists()
+    assert u.is_from.first() is None
+    assert not u.is_from
+
+    u.is_from.connect(Country(code='EX').save())
+    assert u.is_from.exists()
+    assert u.is_from
+    assert u.is_from.first().code == 'EX'
+    assert not u.traverse('is_from').where('code', '=', 'XE').exists()
+
+    ordered = u.traverse('is_from').order_by('code')
+    assert ordered.exists()
+    assert 'ORDER BY' not in str(Query(ordered.last_ast))
+    assert not ordered.skip(1).exists()
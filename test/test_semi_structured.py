@@ -1,4 +1,4 @@
-from neomodel import (StringProperty, IntegerProperty)
+from neomodel import (StringProperty, IntegerProperty, identity_map)
 from neomodel.contrib import SemiStructuredNode
 
 
@@ -14,3 +14,11 @@ def test_save_to_model_with_extras():
     u = UserProf.index.get(age=3)
     assert u.foo is True
     assert u.bar == 99
+
+
+def test_identity_map():
+    UserProf(email='imap@test.com', age=4, bar=1).save()
+    with identity_map():
+        u = UserProf.index.get(email='imap@test.com')
+        assert UserProf.index.get(email='imap@test.com') is u
+        assert u.bar == 1
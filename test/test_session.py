@@ -0,0 +1,152 @@
+from neomodel import (StructuredNode, StringProperty, IntegerProperty,
+        RelationshipTo, ZeroOrOne, AttemptedCardinalityViolation, session, identity_map,
+        SessionFlushError)
+from neomodel.identitymap import current_identity_map
+
+
+class Author(StructuredNode):
+    name = StringProperty(unique_index=True)
+    age = IntegerProperty(index=True)
+    wrote = RelationshipTo('Book', 'WROTE')
+    agent = RelationshipTo('Author', 'AGENT', cardinality=ZeroOrOne)
+
+
+class Book(StructuredNode):
+    title = StringProperty(index=True)
+
+
+def test_session_creates_and_connects():
+    with session():
+        jim = Author(name='Jim Session', age=40).save()
+        book = Book(title='Sessions').save()
+        jim.wrote.connect(book)
+        assert jim.__node__ is None
+
+    assert jim.__node__ is not None
+    assert book.__node__ is not None
+    assert jim.wrote.is_connected(book)
+    assert Author.index.get(name='Jim Session').age == 40
+
+
+def test_session_updates_and_deletes():
+    jim = Author(name='Jim Update', age=41).save()
+    book = Book(title='Deleted').save()
+    jim.wrote.connect(book)
+
+    with session():
+        jim.age = 42
+        jim.save()
+        jim.wrote.disconnect(book)
+        book.delete()
+        assert Author.index.get(name='Jim Update').age == 41
+
+    assert Author.index.get(name='Jim Update').age == 42
+    assert not jim.wrote.all()
+    assert not Book.index.search(title='Deleted')
+
+
+def test_session_discarded_on_error():
+    try:
+        with session():
+            Author(name='Jim Error').save()
+            raise KeyError('x')
+    except KeyError:
+        pass
+    assert not Author.index.search(name='Jim Error')
+
+
+def test_session_cardinality():
+    jim = Author(name='Jim Agent')
+    try:
+        with session():
+            jim.save()
+            jim.agent.connect(Author(name='Agent1').save())
+            jim.agent.connect(Author(name='Agent2').save())
+    except AttemptedCardinalityViolation:
+        assert True
+    else:
+        assert False
+
+
+def test_session_save_then_delete():
+    jim = Author(name='Jim Gone', age=43).save()
+    with session():
+        jim.age = 44
+        jim.save()
+        jim.delete()
+        assert jim.__node__ is not None
+
+    assert jim.__node__ is None
+    assert not Author.index.search(name='Jim Gone')
+
+
+class HookedBook(StructuredNode):
+    title = StringProperty(index=True)
+
+    def post_save(self):
+        self.saved = True
+
+    def post_delete(self):
+        self.deleted = True
+
+
+def test_session_hooks_after_flush():
+    book = HookedBook(title='Hooked').save()
+    book.saved = False
+    try:
+        with session():
+            book.save()
+            book.delete()
+            assert not book.saved
+            raise KeyError('x')
+    except KeyError:
+        pass
+    assert not book.saved
+    assert not hasattr(book, 'deleted')
+    assert book.__node__ is not None
+
+    with session():
+        book.save()
+        book.delete()
+    assert book.saved and book.deleted
+    assert book.__node__ is None
+
+
+def test_session_keeps_recorded_order():
+    old = Author(name='Jim Order').save()
+    with session():
+        old.delete()
+        new = Author(name='Jim Order').save()
+    assert Author.index.get(name='Jim Order') == new
+
+
+def test_session_partial_flush():
+    Author(name='Jim Taken').save()
+    try:
+        with session(batch_size=1):
+            first = HookedBook(title='Committed').save()
+            Author(name='Jim Taken').save()
+    except SessionFlushError as e:
+        assert e.committed == [('create', first)]
+        assert first.saved
+    else:
+        assert False
+
+
+def test_session_identity_map():
+    with identity_map():
+        with session():
+            jim = Author(name='Jim Mapped').save()
+        assert current_identity_map().get(jim.__node__._id) is jim
+        assert Author.index.get(name='Jim Mapped') is jim
+
+
+def test_session_reconnect_zero_or_one():
+    jim = Author(name='Jim Reagent').save()
+    first = Author(name='Agent Old').save()
+    second = Author(name='Agent New').save()
+    jim.agent.connect(first)
+    with session():
+        jim.agent.disconnect(first)
+        jim.agent.connect(second)
+    assert jim.agent.single() == second
@@ -0,0 +1,34 @@
+from neomodel import StructuredNode, StringProperty, RelationshipTo, slowlog
+
+
+class Sloth(StructuredNode):
+    name = StringProperty(unique_index=True)
+    friends = RelationshipTo('Sloth', 'FRIEND')
+
+
+def test_slow_query_log():
+    def redact(params):
+        return dict(params, secret='***') if 'secret' in params else params
+
+    slowlog.clear()
+    slowlog.configure(0.0, size=2)
+    slowlog.add_redactor(redact)
+    try:
+        sid = Sloth(name='Sid').save()
+        sid.cypher("START a=node({self}) WHERE a.name <> {secret} RETURN a", {'secret': 'xyz'})
+        sid.friends.all()
+    finally:
+        slowlog.configure(None)
+        slowlog.remove_redactor(redact)
+
+    entries = slowlog.entries()
+    # bounded to the last two
+    assert len(entries) == 2
+    assert entries[0]['params']['secret'] == '***'
+    assert entries[0]['model'] == 'Sloth' and entries[0]['rows'] == 1
+    assert entries[0]['response_bytes'] > 0
+    assert entries[1]['source'] == 'Sloth.traverse(friends)'
+    assert 'MATCH' in entries[1]['query']
+
+    Sloth.index.search(name='Sid')
+    assert len(slowlog.entries()) == 2
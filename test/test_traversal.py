@@ -1,5 +1,6 @@
-from neomodel.traversal import TraversalSet
-from neomodel import (StructuredNode, RelationshipTo, StringProperty)
+from neomodel.traversal import TraversalSet, Query, ast_shape
+from neomodel import (StructuredNode, RelationshipTo, StringProperty, configure_pool)
+from neomodel import core
 
 
 class Shopper(StructuredNode):
@@ -66,6 +67,19 @@ def test_iteration():
     assert i
 
 
+def test_iteration_frees_pool_slot():
+    jim = setup_shopper('Jill9', 'Barbra9')
+    jim.friend.connect(Shopper(name='tim').save())
+    previous = core.POOL_SIZE, core.POOL_MAX_IN_FLIGHT, core.POOL_TIMEOUT
+    configure_pool(max_in_flight=1, timeout=5)
+    try:
+        # the loop body queries while the traversal is being iterated
+        for friend in jim.traverse('friend'):
+            assert friend.basket.all() is not None
+    finally:
+        configure_pool(*previous)
+
+
 def test_len_and_bool():
     jim = setup_shopper('Jill1', 'Barbra2')
     assert len(jim.traverse('friend'))
@@ -105,3 +119,96 @@ def test_where_clause():
         assert True
     else:
         assert False
+
+
+def test_stream():
+    jim = setup_shopper('Jules', 'Vincent')
+    names = [friend.name for friend in jim.traverse('friend').stream()]
+    assert names == ['Vincent']
+
+
+def test_iterate_chunks():
+    zed = Shopper(name='Zed').save()
+    for name in ['Ann', 'Ben', 'Cat', 'Dan', 'Eve']:
+        zed.friend.connect(Shopper(name=name).save())
+    friends = zed.traverse('friend').order_by('name').skip(1).limit(3)
+    assert [f.name for f in friends.iterate(chunk_size=2)] == ['Ben', 'Cat', 'Dan']
+    names = [f.name for f in zed.traverse('friend').order_by('name').iterate(chunk_size=2)]
+    assert names == ['Ann', 'Ben', 'Cat', 'Dan', 'Eve']
+
+
+def test_result_cache():
+    jim = setup_shopper('Jacky', 'Mia')
+    friends = jim.traverse('friend')
+    assert friends and len(friends) == 1
+    assert friends[0].name == 'Mia'
+
+    jim.friend.connect(Shopper(name='Butch').save())
+    # evaluated sets are served from the cache until invalidated
+    assert len(friends) == 1
+    assert [f.name for f in friends] == ['Mia']
+    assert len(friends.invalidate()) == 2
+    # changing the query drops the cache too
+    assert [f.name for f in friends.where('name', '=', 'Butch')] == ['Butch']
+
+
+def test_prefetch():
+    jim = setup_shopper('Marsellus', 'Winston')
+    friends = jim.traverse('friend').prefetch('basket__item').run()
+    assert friends[0].basket._prefetched is not None
+    basket = friends[0].basket.all()[0]
+    assert isinstance(basket, Basket)
+    assert sorted(i.name for i in basket.item.all()) == ['Screwdriver', 'Tooth brush']
+
+    # writes drop the prefetched nodes
+    basket.item.connect(ShoppingItem(name='Watch').save())
+    assert basket.item._prefetched is None
+    assert len(basket.item.all()) == 3
+
+
+def test_ast_not_modified_by_execution():
+    jim = setup_shopper('Honey', 'Bunny')
+    t = jim.traverse('friend').where('name', '=', 'Bunny').traverse('basket')
+    shape = ast_shape(t.ast)
+    assert len(t) == 1
+    t.run()
+    assert ast_shape(t.ast) == shape
+    # same shape renders the same query
+    assert str(Query(list(t.ast))) is str(Query(list(t.ast)))
+
+
+def test_skip_limit_parameters():
+    jim = setup_shopper('Ringo', 'Yolanda')
+    jim.friend.connect(Shopper(name='Pumpkin').save())
+    first = jim.traverse('friend').order_by('name').limit(1)
+    second = jim.traverse('friend').order_by('name').skip(1).limit(1)
+    assert first.run()[0].name == 'Pumpkin'
+    assert second.run()[0].name == 'Yolanda'
+    query = str(Query(second.last_ast))
+    assert 'SKIP {skip}' in query and 'LIMIT {limit}' in query
+    assert str(Query(first.last_ast)) in query.replace('SKIP {skip}\n', '')
+
+
+def test_keyset_pagination():
+    kim = Shopper(name='Kim').save()
+    for name in ['Ada', 'Bea', 'Cy', 'Di', 'Ed']:
+        kim.friend.connect(Shopper(name=name).save())
+
+    names, cursor = [], None
+    while True:
+        nodes, cursor = kim.traverse('friend').order_by('name').page(2, cursor)
+        names.extend(n.name for n in nodes)
+        if cursor is None:
+            break
+    assert names == ['Ada', 'Bea', 'Cy', 'Di', 'Ed']
+
+    t = kim.traverse('friend').order_by_desc('name')
+    cursor = t.cursor(Shopper.index.get(name='Cy'))
+    assert [n.name for n in kim.traverse('friend').order_by_desc('name').after(cursor)] == ['Bea', 'Ada']
+
+    try:
+        kim.traverse('friend').after('not a cursor')
+    except ValueError:
+        assert True
+    else:
+        assert False